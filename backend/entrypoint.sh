@@ -13,4 +13,8 @@ echo "${0}: running commands"
 python manage.py create_initial_data
 python manage.py import_ingredients data/ingredients.csv
 
-gunicorn foodgram.wsgi:application --bind 0:8001 --reload
+if [ "${SERVER_INTERFACE:-wsgi}" = "asgi" ]; then
+    gunicorn foodgram.asgi:application -k uvicorn.workers.UvicornWorker --bind 0:8001
+else
+    gunicorn foodgram.wsgi:application --bind 0:8001 --reload
+fi
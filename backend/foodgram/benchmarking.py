@@ -0,0 +1,36 @@
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def measure(func, repeat=5):
+    timings = []
+    queries = 0
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries = len(ctx)
+
+    timings.sort()
+    return {
+        'queries': queries,
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = max(0, round(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from foodgram.renderers import get_json_renderer
+
+
+def is_process_local(alias='default'):
+    # Versions bumped by other processes (background task workers,
+    # management commands) never reach a per-process cache.
+    return isinstance(caches[alias], LocMemCache)
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def _initial_version():
+    # Seeding from the clock keeps versions moving forward when a counter
+    # is evicted, so entries cached under an old version are never reused.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_version(name)
+    return versions
+
+
+async def aget_versions(*names):
+    keys = {_version_key(name): name for name in names}
+    found = await cache.aget_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = await sync_to_async(get_version)(name)
+    return versions
+
+
+def bump_version(name):
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+        return cache.get(key)
+
+
+def bump_version_on_commit(name):
+    # Readers must not cache pre-commit data under the new version.
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def get_or_build(key, build, timeout):
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    # Single flight: one process rebuilds a missing entry while the others
+    # wait for it instead of stampeding the database.
+    lock_key = f'lock:{key}'
+    lock_timeout = settings.CACHE_BUILD_LOCK_TIMEOUT
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+    try:
+        value = build()
+        cache.set(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def json_payload(data):
+    body = get_json_renderer().render(data)
+    return {
+        'etag': hashlib.sha1(body).hexdigest(),
+        'identity': body,
+        'gzip': gzip.compress(body),
+    }
+
+
+def cached_json_response(request, key, build_data, timeout=None):
+    if timeout is None:
+        timeout = settings.API_CACHE_TIMEOUT
+    payload = get_or_build(key, lambda: json_payload(build_data()), timeout)
+    return json_payload_response(request, payload)
+
+
+def json_payload_response(request, payload):
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    encoding = 'gzip' if 'gzip' in accept_encoding else 'identity'
+    # Strong validators have to differ between encodings of the same body.
+    etag = '"%s-%s"' % (payload['etag'], encoding)
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        content = payload[encoding]
+        response = HttpResponse(content, content_type='application/json')
+        response['Content-Length'] = len(content)
+        if encoding == 'gzip':
+            response['Content-Encoding'] = 'gzip'
+
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
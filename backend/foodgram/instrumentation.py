@@ -0,0 +1,60 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def normalize_sql(sql):
+    # Queries that differ only in parameters share a shape.
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = STRING_RE.sub('?', sql)
+    return NUMBER_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count > threshold]
+
+
+@contextmanager
+def record_queries(using=None):
+    recorder = QueryRecorder()
+    aliases = [using] if using else connections
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def query_budget(max_queries, using=None):
+    # with query_budget(5):
+    #     client.get('/recipes/')
+    with record_queries(using) as recorder:
+        yield recorder
+    if recorder.count > max_queries:
+        shapes = '\n'.join(f'{count}x {shape}'
+                           for shape, count in recorder.shapes.most_common())
+        raise AssertionError(f'{recorder.count} queries executed, the budget '
+                             f'is {max_queries}:\n{shapes}')
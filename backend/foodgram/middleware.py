@@ -0,0 +1,30 @@
+import logging
+
+from django.conf import settings
+
+from foodgram.instrumentation import record_queries
+
+logger = logging.getLogger('foodgram.sql')
+
+
+class QueryInstrumentationMiddleware:
+    # Queries run while a streaming response is consumed are not counted.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        threshold = settings.SQL_REPEATED_QUERY_THRESHOLD
+        repeated = recorder.repeated(threshold)
+        timings = [f'db;dur={recorder.duration * 1000:.2f};'
+                   f'desc="{recorder.count} queries"']
+        if repeated:
+            timings.append(f'db-repeated;desc="{repeated[0][1]} of one shape"')
+            for shape, count in repeated:
+                logger.warning('%s %s ran %d times: %s', request.method,
+                               request.path, count, shape)
+        response['Server-Timing'] = ', '.join(
+            filter(None, [response.get('Server-Timing')] + timings))
+        return response
@@ -1,5 +1,128 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from foodgram.cache import get_or_build
+
+
+def exact_count(queryset):
+    return queryset.count()
+
+
+def cached_count(queryset):
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'count:' + hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+    return get_or_build(key, queryset.count,
+                        settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+
+
+def estimated_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return cached_count(queryset)
+
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    # Planner estimates are only trusted for big results, where the last
+    # pages are rarely visited anyway.
+    if estimate < settings.PAGINATION_ESTIMATE_THRESHOLD:
+        return cached_count(queryset)
+    return estimate
+
+
+COUNT_STRATEGIES = {
+    'exact': exact_count,
+    'cached': cached_count,
+    'estimated': estimated_count,
+}
+
+
+class CountingPaginator(Paginator):
+    def __init__(self, *args, count_strategy=exact_count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        return self.count_strategy(self.object_list)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    # Views pick another strategy with a `pagination_count_strategy`
+    # attribute, see COUNT_STRATEGIES.
+    count_strategy = settings.PAGINATION_COUNT_STRATEGY
+
+    def paginate_queryset(self, queryset, request, view=None):
+        strategy = getattr(view, 'pagination_count_strategy',
+                           self.count_strategy)
+        self.django_paginator_class = partial(
+            CountingPaginator, count_strategy=COUNT_STRATEGIES[strategy])
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        # Keep explicit orderings chosen by filters, e.g. ordering=popular.
+        ordering = tuple(queryset.query.order_by)
+        if not ordering:
+            return self.ordering
+        return ordering if '-id' in ordering else ordering + ('-id',)
+
+
+class RecipePagination(CustomPageNumberPagination):
+    # Page numbers by default, keyset pagination for clients sending
+    # `cursor`. RECIPES_PAGINATION = 'cursor' flips the default and `page`
+    # then keeps old clients on page numbers.
+    cursor_pagination_class = RecipeCursorPagination
+
+    def __init__(self):
+        self.cursor_pagination = None
+
+    def use_cursor(self, request):
+        params = request.query_params
+        if settings.RECIPES_PAGINATION == 'cursor':
+            return self.page_query_param not in params
+        return self.cursor_pagination_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_pagination = self.cursor_pagination_class()
+        return self.cursor_pagination.paginate_queryset(queryset, request,
+                                                        view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_html_context()
+        return super().get_html_context()
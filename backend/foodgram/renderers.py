@@ -0,0 +1,41 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    # Output matches JSONRenderer: datetimes and everything orjson does not
+    # know natively go through DRF's encoder. Pretty printing, non-compact
+    # settings and values orjson refuses (e.g. ints above 64 bit) fall back
+    # to JSONRenderer.
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+               if orjson is not None else 0)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or indent is not None
+                or not self.compact or self.ensure_ascii):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes these to keep the output a JavaScript subset.
+        return (ret.replace('\u2028'.encode(), b'\\u2028')
+                .replace('\u2029'.encode(), b'\\u2029'))
+
+
+def get_json_renderer():
+    for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES:
+        if issubclass(renderer_class, JSONRenderer):
+            return renderer_class()
+    return JSONRenderer()
@@ -67,6 +67,9 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 # Database
 
+# 'wsgi' or 'asgi', entrypoint.sh starts the matching server.
+SERVER_INTERFACE = os.environ.get('SERVER_INTERFACE', 'wsgi')
+
 DATABASES = {
     'default': {
         'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3'),
@@ -75,6 +78,26 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Persistent connections suit WSGI workers. Under ASGI requests do
+        # not own a thread and kept connections would leak, so they are off
+        # by default there; pool with PgBouncer instead, which in
+        # transaction mode also needs DB_DISABLE_SERVER_SIDE_CURSORS=1.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if SERVER_INTERFACE == 'asgi' else 60)),
+        'CONN_HEALTH_CHECKS': bool(int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 0))),
+    }
+}
+
+# Cached data is invalidated by versions that background task processes
+# and management commands bump too, deployments with more than one process
+# need a shared backend, e.g. CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://cache:6379/0 as in infra/docker-compose.yml.
+# LocMemCache is per process and only fits a single process setup.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -128,7 +151,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'users.authentication.CachedTokenAuthentication'
     ],
 
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
@@ -136,6 +159,31 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# 'orjson' renders and parses API JSON with orjson, output is the same as
+# with DRF's stdlib based classes.
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'json')
+if JSON_BACKEND == 'orjson':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'foodgram.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'foodgram.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# Default count strategy of paginated lists: 'exact', 'cached' (exact
+# count cached per query) or 'estimated' (planner estimate on PostgreSQL
+# above the threshold), views override it with pagination_count_strategy.
+PAGINATION_COUNT_STRATEGY = os.environ.get('PAGINATION_COUNT_STRATEGY', 'exact')
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.environ.get('PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+PAGINATION_ESTIMATE_THRESHOLD = int(os.environ.get('PAGINATION_ESTIMATE_THRESHOLD', 10000))
+
+# 'page' keeps page number pagination for /recipes/ unless a client sends
+# `cursor`; 'cursor' makes keyset pagination the default.
+RECIPES_PAGINATION = os.environ.get('RECIPES_PAGINATION', 'page')
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'TOKEN_MODEL': 'rest_framework.authtoken.models.Token',
@@ -151,3 +199,52 @@ DJOSER = {
         'user_list': ['rest_framework.permissions.AllowAny']
     },
 }
+
+SHOPPING_LIST_CACHE_TIMEOUT = int(os.environ.get('SHOPPING_LIST_CACHE_TIMEOUT', 60 * 60))
+SHOPPING_LIST_CACHE_MAX_SIZE = int(os.environ.get('SHOPPING_LIST_CACHE_MAX_SIZE', 256 * 1024))
+SHOPPING_LIST_PDF_FONT = os.environ.get('SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+INGREDIENT_INDEX_TIMEOUT = int(os.environ.get('INGREDIENT_INDEX_TIMEOUT', 24 * 60 * 60))
+
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 24 * 60 * 60))
+ANONYMOUS_RECIPES_CACHE_TIMEOUT = int(os.environ.get('ANONYMOUS_RECIPES_CACHE_TIMEOUT', 60))
+CACHE_BUILD_LOCK_TIMEOUT = int(os.environ.get('CACHE_BUILD_LOCK_TIMEOUT', 5))
+# Viewer independent part of every rendered recipe.
+RECIPE_CONTENT_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CONTENT_CACHE_TIMEOUT', 24 * 60 * 60))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+# Favorite, shopping cart and subscription ids of every user.
+RELATIONS_CACHE_TIMEOUT = int(os.environ.get('RELATIONS_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Most recipes added to or removed from favorites or the shopping cart by
+# one batch request.
+RECIPE_BATCH_MAX_SIZE = int(os.environ.get('RECIPE_BATCH_MAX_SIZE', 100))
+
+# Recipes of authors with more followers are not copied to the feeds of
+# their followers, feeds read them from the recipes table instead.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.environ.get('FEED_FANOUT_MAX_FOLLOWERS', 10000))
+FEED_FANOUT_BATCH_SIZE = int(os.environ.get('FEED_FANOUT_BATCH_SIZE', 1000))
+FEED_PULL_AUTHORS_TIMEOUT = int(os.environ.get('FEED_PULL_AUTHORS_TIMEOUT', 10 * 60))
+
+# 'thread', 'process' or 'sync' (runs tasks right after commit, for
+# development and tests).
+BACKGROUND_TASKS_EXECUTOR = os.environ.get('BACKGROUND_TASKS_EXECUTOR', 'thread')
+BACKGROUND_TASKS_WORKERS = int(os.environ.get('BACKGROUND_TASKS_WORKERS', 2))
+
+# Longest side in pixels of every rendition of a recipe image.
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': 320,
+    'medium': 960,
+    'large': 1920,
+}
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 50_000_000))
+
+# Adds Server-Timing headers with query count and database time and logs
+# SQL shapes repeated more than the threshold within one request.
+SQL_INSTRUMENTATION = bool(int(os.environ.get('SQL_INSTRUMENTATION', 0)))
+SQL_REPEATED_QUERY_THRESHOLD = int(os.environ.get('SQL_REPEATED_QUERY_THRESHOLD', 5))
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE = ['foodgram.middleware.QueryInstrumentationMiddleware'] + MIDDLEWARE
+
+# Serve plain JSON reads of recipes, tags and ingredients from async views
+# when running under ASGI, see recipes.async_views.
+ASYNC_READ_VIEWS = bool(int(os.environ.get('ASYNC_READ_VIEWS', 0)))
@@ -0,0 +1,65 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _init_worker():
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            workers = settings.BACKGROUND_TASKS_WORKERS
+            if settings.BACKGROUND_TASKS_EXECUTOR == 'process':
+                # Forked children would share the parent's database
+                # connections, spawned ones open their own.
+                _executor = ProcessPoolExecutor(
+                    workers, multiprocessing.get_context('spawn'),
+                    initializer=_init_worker)
+            else:
+                _executor = ThreadPoolExecutor(
+                    workers, thread_name_prefix='background')
+    return _executor
+
+
+def _run(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # Worker threads never pass through request_finished.
+        connections.close_all()
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Background task failed', exc_info=error)
+
+
+def run_in_background(func, *args):
+    # Tasks see committed rows only. func has to be a module level function
+    # so it can be sent to a process pool.
+    def submit():
+        if settings.BACKGROUND_TASKS_EXECUTOR == 'sync':
+            try:
+                func(*args)
+            except Exception:
+                logger.exception('Background task failed')
+            return
+        _get_executor().submit(_run, func, *args).add_done_callback(
+            _log_failure)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# Load comparison of the WSGI and ASGI servers started by entrypoint.sh.
+#
+#   python loadtest.py --concurrency 32 --duration 20 --output results.json
+#
+# Seeds a throwaway SQLite database with the `manage.py bench` dataset,
+# boots gunicorn once per interface with the same command line as
+# entrypoint.sh and hammers the read endpoints from client threads with
+# keep-alive connections.
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'foodgram.wsgi:application'],
+    'asgi': ['gunicorn', 'foodgram.asgi:application',
+             '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+def seed(env, options):
+    os.environ.update(env)
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from recipes.management.commands.bench import Command as Bench
+    from recipes.models import Recipe
+    from users.models import User
+
+    call_command('migrate', verbosity=0)
+    dataset = Bench().seed({
+        'users': options.users, 'recipes': options.recipes,
+        'follows': options.follows, 'favorites': options.follows,
+        'csv_file': settings.BASE_DIR.parent / 'data' / 'ingredients.csv',
+        'seed': 1,
+    })
+    viewer = User.objects.order_by('id').first()
+    token = Token.objects.create(user=viewer).key
+    recipe_id = Recipe.objects.order_by('-favorites_count').first().id
+    return dataset, token, [
+        '/recipes/?limit=10',
+        f'/recipes/{recipe_id}/',
+        '/tags/',
+        '/ingredients/?name=' + quote('сы'),
+        '/users/subscriptions/?limit=10&recipes_limit=3',
+    ]
+
+
+def wait_for(port, server, log_path, timeout=30):
+    # Booted means a worker answers, not just that the socket is bound.
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port,
+                                                    timeout=5)
+            connection.request('GET', '/tags/')
+            if connection.getresponse().status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    with open(log_path, encoding='utf-8') as log:
+        raise RuntimeError(f'Server did not start on port {port}:\n'
+                           + log.read())
+
+
+def client(port, token, paths, deadline, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            ok = False
+        results.append((path, ok, time.perf_counter() - started))
+
+
+def run_load(port, token, paths, options):
+    # Warm up caches and lazily built indexes first.
+    client(port, token, paths, time.monotonic() + 2, [])
+    results = []
+    deadline = time.monotonic() + options.duration
+    threads = [threading.Thread(target=client,
+                                args=(port, token, paths, deadline, results))
+               for _ in range(options.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings = sorted(elapsed for _, ok, elapsed in results if ok)
+    errors = sum(1 for _, ok, _ in results if not ok)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'rps': round(len(timings) / options.duration, 1),
+        'p50_ms': round(statistics.median(timings) * 1000, 1),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 1),
+        'p99_ms': round(timings[int(len(timings) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interfaces', nargs='+', default=['wsgi', 'asgi'],
+                        choices=SERVERS)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--recipes', type=int, default=500)
+    parser.add_argument('--follows', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', type=str)
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodgram-load-')
+    env = {
+        'DJANGO_SETTINGS_MODULE': 'foodgram.settings',
+        'DB_NAME': os.path.join(workdir, 'db.sqlite3'),
+        'BACKGROUND_TASKS_EXECUTOR': 'sync',
+    }
+    dataset, token, paths = seed(env, options)
+
+    report = {'dataset': dataset, 'options': vars(options), 'servers': {}}
+    for interface in options.interfaces:
+        server_env = {**os.environ, **env, 'SERVER_INTERFACE': interface,
+                      'ASYNC_READ_VIEWS': str(int(interface == 'asgi'))}
+        command = SERVERS[interface] + [
+            '--bind', f'127.0.0.1:{options.port}',
+            '--workers', str(options.workers)]
+        log_path = os.path.join(workdir, f'{interface}.log')
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen(command, cwd=BASE_DIR, env=server_env,
+                                      stdout=log, stderr=subprocess.STDOUT)
+        try:
+            wait_for(options.port, server, log_path)
+            report['servers'][interface] = run_load(options.port, token,
+                                                    paths, options)
+        finally:
+            server.terminate()
+            server.wait()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,13 +10,13 @@ class RecipeIngredientInLine(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorite_count')
+    list_display = ('name', 'author', 'favorites_count')
     list_filter = ('name', 'author', 'tags')
     inlines = (RecipeIngredientInLine,)
-    readonly_fields = ('favorite_count',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
     def get_queryset(self, request):
-        return Recipe.objects.with_related()
+        return Recipe.objects.for_admin()
 
 
 @admin.register(Ingredient)
@@ -35,11 +35,23 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
 
 
-@admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class UserRecipeAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
 
+    def get_readonly_fields(self, request, obj=None):
+        # Counters and per-user versions are kept by the post_save and
+        # post_delete handlers, which only see the new values. Moving a
+        # row to another user or recipe is a delete and an add instead.
+        if obj is not None:
+            return ('user', 'recipe')
+        return ()
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(UserRecipeAdmin):
+    pass
+
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
+class ShoppingCartAdmin(UserRecipeAdmin):
+    pass
@@ -0,0 +1,176 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.authentication import get_authorization_header
+from rest_framework.request import Request
+
+from foodgram.cache import aget_versions, json_payload, json_payload_response
+from foodgram.pagination import COUNT_STRATEGIES, CountingPaginator
+from foodgram.renderers import get_json_renderer
+from recipes.filters import RecipeFilter
+from recipes.ingredient_index import get_ingredient_index
+from recipes.mixins import list_cache_key
+from recipes.models import Recipe, Tag
+from recipes.relations import FOLLOWS
+from recipes.representations import RecipeRepresentation, represent_tag
+from recipes.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from users.authentication import aget_token
+
+# Async variants of the read endpoints for ASGI deployments. They cover
+# plain JSON GET requests; anything else (other methods, the browsable
+# API, cursor pages, errors, anonymous recipe lists served from the
+# cache) is handed to the regular viewset, which stays the reference.
+
+
+def accepts_json(request):
+    return ('format' not in request.GET
+            and 'text/html' not in request.headers.get('Accept', ''))
+
+
+async def authenticate(request):
+    # Mirrors CachedTokenAuthentication. None means the request has to go
+    # through DRF to get the same error response.
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    token = await aget_token(key)
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def json_response(data, allow):
+    response = HttpResponse(get_json_renderer().render(data),
+                            content_type='application/json')
+    response['Vary'] = 'Accept'
+    response['Allow'] = allow
+    return response
+
+
+async def representation_context(request):
+    context = {'request': request}
+    if request.user.is_authenticated:
+        context['subscribed_ids'] = await sync_to_async(FOLLOWS.ids)(
+            request.user.id)
+    return context
+
+
+@sync_to_async
+def recipes_queryset(user):
+    # The flags are built from the relation cache, which falls back to
+    # the database on a miss.
+    return (Recipe.objects.for_representation()
+            .annotate_is_favorited(user)
+            .annotate_is_in_shopping_cart(user))
+
+
+async def recipe_list(request):
+    pagination = RecipeViewSet.pagination_class()
+    drf_request = Request(request)
+    if (not request.user.is_authenticated
+            or pagination.use_cursor(drf_request)):
+        return None
+
+    filterset = RecipeFilter(request.GET, request=request,
+                             queryset=await recipes_queryset(request.user))
+    # Form validation may look up the author and relation filters may
+    # load ids from the database.
+    queryset = await sync_to_async(
+        lambda: filterset.qs if filterset.is_valid() else None)()
+    if queryset is None:
+        return None
+
+    count_strategy = COUNT_STRATEGIES[RecipeViewSet.pagination_count_strategy]
+    count = await sync_to_async(count_strategy)(queryset)
+    paginator = CountingPaginator(queryset,
+                                  pagination.get_page_size(drf_request),
+                                  count_strategy=lambda queryset: count)
+    try:
+        page = paginator.page(
+            pagination.get_page_number(drf_request, paginator))
+    except InvalidPage:
+        return None
+    recipes = [recipe async for recipe in page.object_list]
+
+    pagination.page, pagination.request = page, drf_request
+    context = await representation_context(request)
+    # Contents missing in the cache are loaded from the database.
+    results = await sync_to_async(
+        lambda: RecipeRepresentation(recipes, many=True,
+                                     context=context).data)()
+    return json_response({
+        'count': count,
+        'next': pagination.get_next_link(),
+        'previous': pagination.get_previous_link(),
+        'results': results,
+    }, allow='GET, POST, HEAD, OPTIONS')
+
+
+async def recipe_detail(request, pk):
+    queryset = await recipes_queryset(request.user)
+    recipe = await queryset.filter(pk=pk).afirst()
+    if recipe is None:
+        return None
+    context = await representation_context(request)
+    data = await sync_to_async(
+        lambda: RecipeRepresentation(recipe, context=context).data)()
+    return json_response(data, allow='GET, PUT, PATCH, DELETE, HEAD, OPTIONS')
+
+
+async def cached_list(request, basename, names, build_data):
+    # Shares entries with VersionedListCacheMixin.
+    versions = await aget_versions(*names)
+    key = list_cache_key(basename, request, names, versions)
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = json_payload(await build_data())
+        await cache.aset(key, payload, settings.API_CACHE_TIMEOUT)
+    response = json_payload_response(request, payload)
+    response['Allow'] = 'GET, HEAD, OPTIONS'
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def tag_list(request):
+    async def build_data():
+        return [represent_tag(tag) async for tag in Tag.objects.all()]
+
+    return await cached_list(request, 'tags', TagViewSet.cache_versions,
+                             build_data)
+
+
+async def ingredient_list(request):
+    async def build_data():
+        index = await sync_to_async(get_ingredient_index)()
+        query = request.GET.get('name')
+        return index.search(query) if query else index.all()
+
+    return await cached_list(request, 'ingredients',
+                             IngredientViewSet.cache_versions, build_data)
+
+
+def read_view(handler, fallback):
+    fallback = sync_to_async(fallback)
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and accepts_json(request):
+            user = await authenticate(request)
+            if user is not None:
+                request.user = user
+                response = await handler(request, *args, **kwargs)
+                if response is not None:
+                    return response
+        return await fallback(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
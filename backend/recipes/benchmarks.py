@@ -0,0 +1,270 @@
+import base64
+import datetime
+import decimal
+import io
+import json
+import os
+import random
+import uuid
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import CommandError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from foodgram.benchmarking import measure
+from foodgram.parsers import ORJSONParser
+from foodgram.renderers import ORJSONRenderer, orjson
+from recipes.admin import RecipeAdmin
+from recipes.ingredient_index import get_ingredient_index
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.representations import RecipeRepresentation
+from recipes.serializers import (IngredientSerializer,
+                                 RecipeListRetrieveSerializer)
+from users.models import User
+
+# Scenarios of `manage.py bench`. Each one runs on the seeded test
+# database, gets the command options and returns its part of the report.
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def endpoint_urls(options):
+    viewer = User.objects.order_by('id').first()
+    recipe = Recipe.objects.order_by('-favorites_count').first()
+    limit = options['page_size']
+    return (
+        ('recipes_list_anonymous', None, f'/recipes/?limit={limit}'),
+        ('recipes_list', viewer, f'/recipes/?limit={limit}'),
+        ('recipes_list_last_page', viewer,
+         f'/recipes/?limit={limit}'
+         f'&page={max(1, Recipe.objects.count() // limit)}'),
+        ('recipes_list_cursor', viewer,
+         f'/recipes/?limit={limit}&cursor='),
+        ('recipes_list_tags', viewer,
+         f'/recipes/?limit={limit}&tags=breakfast&tags=soup'),
+        ('recipes_list_favorited', viewer,
+         f'/recipes/?limit={limit}&is_favorited=1'),
+        ('recipes_list_popular', viewer,
+         f'/recipes/?limit={limit}&ordering=popular'),
+        ('recipes_search', viewer, f'/recipes/?limit={limit}&search=борщ'),
+        ('recipes_feed', viewer, f'/recipes/feed/?limit={limit}'),
+        ('recipes_retrieve', viewer, f'/recipes/{recipe.id}/'),
+        ('download_shopping_cart', viewer,
+         '/recipes/download_shopping_cart/'),
+        ('tags_list', None, '/tags/'),
+        ('ingredients_search', None, '/ingredients/?name=сы'),
+        ('users_list', viewer, f'/users/?limit={limit}'),
+        ('users_me', viewer, '/users/me/'),
+        ('users_subscriptions', viewer,
+         f'/users/subscriptions/?limit={limit}&recipes_limit=3'),
+    )
+
+
+def endpoints(options):
+    # Latency, queries and memory of the API endpoints.
+    clients = {}
+    results = {}
+    for name, user, url in endpoint_urls(options):
+        if user not in clients:
+            clients[user] = api_client(user)
+        client = clients[user]
+
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            return response
+
+        # The first request warms up caches and lazily built indexes.
+        request()
+        results[name] = {'url': url, **measure(request, options['repeat'])}
+    return results
+
+
+def recipe_queryset(options):
+    # Queries and memory of one page of the recipe list and of the admin
+    # changelist as the first page gets more fans.
+    page = list(Recipe.objects.order_by('-created_at', '-id')
+                [:options['page_size']])
+    user = AnonymousUser()
+
+    def render_list():
+        queryset = (Recipe.objects.for_list()
+                    .annotate_is_favorited(user)
+                    .annotate_is_in_shopping_cart(user))
+        return RecipeListRetrieveSerializer(
+            queryset[:options['page_size']], many=True).data
+
+    def render_admin():
+        return [str(recipe) for recipe in
+                Recipe.objects.for_admin()[:RecipeAdmin.list_per_page]]
+
+    results = []
+    fans = 0
+    for level in sorted(options['fans']):
+        if level > fans:
+            new_fans = User.objects.bulk_create(
+                User(username=f'bench-fan-{i}',
+                     email=f'bench-fan-{i}@bench.local')
+                for i in range(fans, level))
+            for model in (Favorite, ShoppingCart):
+                model.objects.bulk_create(
+                    (model(user=fan, recipe=recipe)
+                     for fan in new_fans for recipe in page),
+                    batch_size=1000)
+            fans = level
+        results.append({
+            'fans_per_recipe': level,
+            'list': measure(render_list, options['repeat']),
+            'admin': measure(render_admin, options['repeat']),
+        })
+    return results
+
+
+def serializers(options):
+    # Per recipe rendering cost of RecipeListRetrieveSerializer and
+    # RecipeRepresentation on already fetched pages, the latter with warm
+    # recipe contents.
+    viewer = User.objects.order_by('id').first()
+    request = Request(APIRequestFactory().get('/recipes/'))
+    request.user = viewer
+
+    results = []
+    for page_size in options['page_sizes']:
+        recipes = list(Recipe.objects.for_list()
+                       .annotate_is_favorited(viewer)
+                       .annotate_is_in_shopping_cart(viewer)[:page_size])
+        row = {'page_size': page_size}
+        bodies = set()
+        for name, serializer_class in (
+            ('serializer', RecipeListRetrieveSerializer),
+            ('representation', RecipeRepresentation),
+        ):
+            def render():
+                return serializer_class(recipes, many=True,
+                                        context={'request': request}).data
+
+            bodies.add(JSONRenderer().render(render()))
+            stats = measure(render, options['repeat'])
+            stats['per_item_us'] = round(
+                stats['p50_ms'] * 1000 / len(recipes), 1)
+            row[name] = stats
+        if len(bodies) != 1:
+            raise CommandError(f'Outputs differ for a page of {page_size}')
+        row['speedup'] = round(row['serializer']['p50_ms']
+                               / row['representation']['p50_ms'], 2)
+        results.append(row)
+    return results
+
+
+def ingredient_search(options):
+    # Ingredient autocomplete through the ORM and through the in-memory
+    # index.
+    names = list(Ingredient.objects.values_list('name', flat=True))
+    rng = random.Random(options['seed'])
+    queries = [name[:rng.randint(1, min(len(name), 5))]
+               for name in rng.choices(names, k=options['queries'])]
+
+    def orm():
+        for query in queries:
+            IngredientSerializer(
+                Ingredient.objects.filter(name__istartswith=query),
+                many=True).data
+
+    def index():
+        search = get_ingredient_index().search
+        for query in queries:
+            search(query)
+
+    return {
+        'ingredients': len(names),
+        'queries': len(queries),
+        'index_build': measure(get_ingredient_index, 1),
+        'orm': measure(orm, options['repeat']),
+        'index': measure(index, options['repeat']),
+    }
+
+
+def edge_cases():
+    return {
+        'aware': timezone.make_aware(
+            datetime.datetime(2023, 7, 1, 12, 30, 15, 123456),
+            datetime.timezone.utc),
+        'naive': datetime.datetime(2023, 7, 1, 12, 30),
+        'date': datetime.date(2023, 7, 1),
+        'time': datetime.time(8, 5, 3, 500),
+        'duration': datetime.timedelta(hours=1, seconds=3),
+        'decimal': decimal.Decimal('12.50'),
+        'lazy': gettext_lazy('email address'),
+        'uuid': uuid.UUID(int=1),
+        'separators': 'line\u2028paragraph\u2029end',
+        'unicode': 'щи 🍲 "quoted" \\ \n',
+        'tuple': (1, 2.5, None),
+        'int_keys': {1: 'one'},
+        'big': 2 ** 70,
+    }
+
+
+def json_backends(options):
+    # The orjson renderer and parser against DRF's JSON classes: same
+    # output, and their throughput on a recipe page and an image upload.
+    if orjson is None:
+        raise CommandError('orjson is not installed')
+
+    # Anonymous lists are served as cached bytes, a user gets rendered data.
+    viewer = User.objects.order_by('id').first()
+    page = api_client(viewer).get(
+        f'/recipes/?limit={max(options["page_sizes"])}').data
+    for name, data in (('page', page), ('edge cases', edge_cases())):
+        if ORJSONRenderer().render(data) != JSONRenderer().render(data):
+            raise CommandError(f'Rendered {name} differs')
+
+    image = base64.b64encode(os.urandom(options['upload_kib'] * 1024))
+    upload = json.dumps({
+        'name': 'Рецепт', 'text': 'текст', 'cooking_time': 10,
+        'tags': [1, 2], 'ingredients': [{'id': 1, 'amount': 10}],
+        'image': 'data:image/png;base64,' + image.decode(),
+    }).encode()
+    if (ORJSONParser().parse(io.BytesIO(upload))
+            != JSONParser().parse(io.BytesIO(upload))):
+        raise CommandError('Parsed upload differs')
+
+    page_bytes = len(JSONRenderer().render(page))
+    results = {}
+    for name, renderer, parser in (
+        ('json', JSONRenderer(), JSONParser()),
+        ('orjson', ORJSONRenderer(), ORJSONParser()),
+    ):
+        render = measure(lambda: renderer.render(page), options['repeat'])
+        parse = measure(lambda: parser.parse(io.BytesIO(upload)),
+                        options['repeat'])
+        render['mib_per_s'] = round(
+            page_bytes / 2 ** 20 / (render['p50_ms'] / 1000), 1)
+        parse['mib_per_s'] = round(
+            len(upload) / 2 ** 20 / (parse['p50_ms'] / 1000), 1)
+        results[name] = {'render_page': render, 'parse_upload': parse}
+
+    results['page_bytes'] = page_bytes
+    results['upload_bytes'] = len(upload)
+    return results
+
+
+SCENARIOS = {
+    'endpoints': endpoints,
+    'recipe_queryset': recipe_queryset,
+    'serializers': serializers,
+    'ingredient_search': ingredient_search,
+    'json': json_backends,
+}
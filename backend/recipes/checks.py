@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+
+from foodgram.cache import is_process_local
+from recipes.exports import canvas, register_pdf_font
+
+
+@register()
+def pdf_font_check(app_configs, **kwargs):
+    if canvas is None:
+        return []
+    try:
+        register_pdf_font()
+    except ImproperlyConfigured as error:
+        return [Warning(
+            str(error),
+            hint='Install fonts-dejavu-core or point SHOPPING_LIST_PDF_FONT '
+                 'to a TTF font with Cyrillic glyphs. PDF shopping lists '
+                 'fail until then.',
+            id='recipes.W001',
+        )]
+    return []
+
+
+@register()
+def background_tasks_cache_check(app_configs, **kwargs):
+    if (settings.BACKGROUND_TASKS_EXECUTOR != 'process'
+            or not is_process_local()):
+        return []
+    return [Error(
+        'BACKGROUND_TASKS_EXECUTOR is "process" with a per-process cache.',
+        hint='Version bumps made by the task processes (recipe image '
+             'renditions and others) never reach the web process. Set '
+             'CACHE_BACKEND to a shared backend such as RedisCache.',
+        id='recipes.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    if not is_process_local():
+        return []
+    return [Warning(
+        'The default cache is a per-process LocMemCache.',
+        hint='Every server worker keeps its own cache and its own '
+             'ingredient index, and versions bumped by other processes '
+             '(management commands, background tasks) never reach it. Set '
+             'CACHE_BACKEND to a shared backend such as RedisCache.',
+        id='recipes.W002',
+    )]
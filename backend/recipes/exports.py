@@ -0,0 +1,174 @@
+import csv
+import hashlib
+import io
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from foodgram.cache import get_versions
+from recipes.models import ShoppingCart
+from recipes.versions import RECIPE_INGREDIENTS_VERSION, shopping_cart_version
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+def register_pdf_font():
+    # Built-in PDF fonts have no Cyrillic glyphs, without the TTF font the
+    # list would come out as black boxes.
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    try:
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    except (OSError, TTFError) as error:
+        raise ImproperlyConfigured(
+            f'SHOPPING_LIST_PDF_FONT {font_path!r} can not be loaded: '
+            f'{error}') from error
+    return PDF_FONT_NAME
+
+
+class ShoppingListExport:
+    title = 'Список покупок:'
+    chunk_size = 2000
+    content_types = {
+        'txt': 'text/plain; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+        'json': 'application/json',
+        'pdf': 'application/pdf',
+    }
+
+    def __init__(self, user, export_format='txt'):
+        self.user = user
+        self.format = export_format
+        versions = get_versions(shopping_cart_version(user.id),
+                                RECIPE_INGREDIENTS_VERSION)
+        self.cache_key = ':'.join(
+            ['shopping-list', str(user.id), export_format]
+            + [str(versions[name]) for name in sorted(versions)]
+        )
+        self.etag = '"%s"' % hashlib.md5(self.cache_key.encode()).hexdigest()
+
+    def response(self, request):
+        if self.format == 'pdf':
+            # Fails before the response starts streaming.
+            register_pdf_font()
+        if self.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            content = cache.get(self.cache_key)
+            if content is not None:
+                response = HttpResponse(
+                    content, content_type=self.content_types[self.format])
+                response['Content-Length'] = len(content)
+            else:
+                response = StreamingHttpResponse(
+                    self._cache_stream(self.stream()),
+                    content_type=self.content_types[self.format])
+            response['Content-Disposition'] = (
+                f'attachment; filename="list.{self.format}"')
+
+        response['ETag'] = self.etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def stream(self):
+        rows = (
+            ShoppingCart.ingredients(self.user)
+            .iterator(chunk_size=self.chunk_size)
+        )
+        for chunk in getattr(self, f'_stream_{self.format}')(rows):
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
+    def _cache_stream(self, chunks):
+        max_size = settings.SHOPPING_LIST_CACHE_MAX_SIZE
+        cached, size = [], 0
+        for chunk in chunks:
+            if cached is not None:
+                size += len(chunk)
+                if size <= max_size:
+                    cached.append(chunk)
+                else:
+                    cached = None
+            yield chunk
+
+        if cached is not None:
+            cache.set(self.cache_key, b''.join(cached),
+                      settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+    def _stream_txt(self, rows):
+        yield f'{self.title}\n'
+        for row in rows:
+            yield (f"\n- {row['ingredient__name']} — {row['total_amount']} "
+                   f"{row['ingredient__measurement_unit']}")
+
+    def _stream_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        writer.writerow(('name', 'amount', 'measurement_unit'))
+        yield flush()
+        for row in rows:
+            writer.writerow((row['ingredient__name'], row['total_amount'],
+                             row['ingredient__measurement_unit']))
+            yield flush()
+
+    def _stream_json(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps({
+                'name': row['ingredient__name'],
+                'amount': row['total_amount'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+    def _stream_pdf(self, rows):
+        # PDF needs a cross-reference table at the end, so the document is
+        # assembled in memory and only sent in chunks.
+        buffer = io.BytesIO()
+        font = register_pdf_font()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        _, height = A4
+        top, bottom, left, step = height - 50, 50, 50, 18
+
+        pdf.setFont(font, 16)
+        pdf.drawString(left, top, self.title)
+        y = top - 2 * step
+        pdf.setFont(font, 12)
+        for row in rows:
+            if y < bottom:
+                pdf.showPage()
+                pdf.setFont(font, 12)
+                y = top
+            pdf.drawString(
+                left, y,
+                f"- {row['ingredient__name']} — {row['total_amount']} "
+                f"{row['ingredient__measurement_unit']}")
+            y -= step
+        pdf.save()
+
+        buffer.seek(0)
+        while chunk := buffer.read(64 * 1024):
+            yield chunk
@@ -0,0 +1,148 @@
+import base64
+import binascii
+from datetime import datetime
+from heapq import merge
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from rest_framework.exceptions import NotFound
+
+from foodgram.cache import get_or_build
+from recipes.models import FeedEntry, Recipe
+from recipes.relations import FOLLOWS
+from users.models import Follow
+
+# New recipes are written to the timelines of the author's followers in
+# the background (fan-out on write). Recipes of authors with more than
+# FEED_FANOUT_MAX_FOLLOWERS followers are not copied, feeds read them
+# straight from the recipes table instead (fan-out on read). When an
+# author drops under the threshold, the recipes published above it reach
+# timelines only after the rebuild_feeds command.
+#
+# Timelines are read from FeedEntry alone, ordered by the copied
+# publication date, recipes are fetched only for the rows of a page.
+# Entries are written while holding the Follow row, and unfollows delete
+# them in the same transaction, so a late fan-out can't leave recipes of
+# an unfollowed author behind.
+
+
+def pull_author_ids():
+    def build():
+        return frozenset(
+            Follow.objects.values('author_id')
+            .annotate(followers=Count('id'))
+            .filter(followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS)
+            .values_list('author_id', flat=True)
+        )
+
+    return get_or_build('feed:pull-authors', build,
+                        settings.FEED_PULL_AUTHORS_TIMEOUT)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def add_entries(entries):
+    # Unsaved FeedEntry objects; entries already there are skipped.
+    size = settings.FEED_FANOUT_BATCH_SIZE
+    FeedEntry.objects.bulk_create(entries, batch_size=size,
+                                  ignore_conflicts=True)
+
+
+def fan_out_recipe(recipe_id):
+    recipe = (Recipe.objects.filter(pk=recipe_id)
+              .values('author_id', 'created_at').first())
+    if recipe is None or recipe['author_id'] in pull_author_ids():
+        return
+    followers = (Follow.objects.filter(author_id=recipe['author_id'])
+                 .values_list('user_id', flat=True).order_by('user_id'))
+    size = settings.FEED_FANOUT_BATCH_SIZE
+    for batch in batches(followers.iterator(chunk_size=size), size):
+        with transaction.atomic():
+            # Followers who unfollowed since the list was read are skipped.
+            user_ids = (Follow.objects.select_for_update()
+                        .filter(author_id=recipe['author_id'],
+                                user_id__in=batch)
+                        .values_list('user_id', flat=True))
+            add_entries([FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                                   created_at=recipe['created_at'])
+                         for user_id in user_ids])
+
+
+def add_author(user_id, author_id):
+    # Backfills the timeline when a user follows an author.
+    if author_id in pull_author_ids():
+        return
+    with transaction.atomic():
+        if not Follow.objects.select_for_update().filter(
+                user_id=user_id, author_id=author_id).exists():
+            return
+        recipes = (Recipe.objects.filter(author_id=author_id)
+                   .values_list('id', 'created_at').order_by('id'))
+        size = settings.FEED_FANOUT_BATCH_SIZE
+        for batch in batches(recipes.iterator(chunk_size=size), size):
+            add_entries([FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                                   created_at=created_at)
+                         for recipe_id, created_at in batch])
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id,
+                             recipe__author_id=author_id).delete()
+
+
+def rebuild_feed(user_id):
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    for author_id in FOLLOWS.load(user_id):
+        add_author(user_id, author_id)
+
+
+def encode_cursor(position):
+    created_at, recipe_id = position
+    raw = f'{created_at.isoformat()} {recipe_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, recipe_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split(' '))
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound('Invalid cursor')
+
+
+def after(position, created_at_field, id_field):
+    if position is None:
+        return Q()
+    created_at, recipe_id = position
+    return (Q(**{f'{created_at_field}__lt': created_at})
+            | Q(**{created_at_field: created_at, f'{id_field}__lt': recipe_id}))
+
+
+def read_feed(user, position, limit):
+    # (created_at, recipe_id) pairs of one page, newest first, and the
+    # position of the next page or None.
+    entries = (FeedEntry.objects.filter(user_id=user.id)
+               .filter(after(position, 'created_at', 'recipe_id'))
+               .order_by('-created_at', '-recipe_id')
+               .values_list('created_at', 'recipe_id')[:limit + 1])
+    pages = [list(entries)]
+    pulled = FOLLOWS.ids(user.id) & pull_author_ids()
+    if pulled:
+        recipes = (Recipe.objects.filter(author_id__in=sorted(pulled))
+                   .filter(after(position, 'created_at', 'id'))
+                   .order_by('-created_at', '-id')
+                   .values_list('created_at', 'id')[:limit + 1])
+        pages.append(list(recipes))
+    # Recipes of authors that crossed the threshold can be in both.
+    unique = (row for row, _ in groupby(merge(*pages, reverse=True)))
+    rows = list(islice(unique, limit + 1))
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]
+    return rows, None
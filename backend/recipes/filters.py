@@ -1,26 +1,85 @@
+from django import forms
+from django.core.validators import validate_slug
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes import fulltext
+from recipes.models import Recipe
+from recipes.relations import FAVORITES, SHOPPING_CART
+
+
+class SlugListField(forms.Field):
+    # SelectMultiple reads repeated query parameters: ?tags=a&tags=b
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return list(dict.fromkeys(slug for slug in value or () if slug))
+
+    def validate(self, value):
+        super().validate(value)
+        for slug in value:
+            validate_slug(slug)
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
 
 
 class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
-    tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                             queryset=Tag.objects.all(),
-                                             to_field_name='slug')
+    tags = SlugListFilter(method='filter_tags')
+    tags_match = filters.ChoiceFilter(choices=(('any', 'any'),
+                                               ('all', 'all')),
+                                      method='filter_tags_match')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    min_favorites = filters.NumberFilter(field_name='favorites_count',
+                                         lookup_expr='gte')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(choices=(('popular', 'popular'),),
+                                    method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'is_favorited', 'tags', 'is_in_shopping_cart')
+        fields = ('author', 'is_favorited', 'tags', 'tags_match',
+                  'is_in_shopping_cart', 'min_favorites', 'search',
+                  'ordering')
 
     def filter_is_favorited(self, queryset, name, value):
-        return queryset.filter(is_favorited=value)
+        return self.filter_relation(queryset, FAVORITES, value)
+
+    def filter_tags(self, queryset, name, value):
+        # EXISTS instead of a join keeps one row per recipe, so no DISTINCT
+        # is needed whatever the number of selected tags.
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for slug in value:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag__slug=slug)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag__slug__in=value)))
+
+    def filter_tags_match(self, queryset, name, value):
+        # Only changes how filter_tags combines the selected tags.
+        return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        return queryset.filter(is_in_shopping_cart=value)
+        return self.filter_relation(queryset, SHOPPING_CART, value)
+
+    def filter_relation(self, queryset, relation, value):
+        # id IN (...) with the cached ids of the user, not a join.
+        ids = sorted(relation.ids(self.request.user.pk))
+        if value:
+            return queryset.filter(pk__in=ids)
+        return queryset.exclude(pk__in=ids)
+
+    def filter_search(self, queryset, name, value):
+        return fulltext.search(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by('-favorites_count', '-created_at')
 
 
 class IngredientSearchFilter(SearchFilter):
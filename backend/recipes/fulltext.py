@@ -0,0 +1,98 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+# Endings stripped before prefix matching on SQLite, which has no Russian
+# stemmer. PostgreSQL uses the 'russian' text search configuration.
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ий', 'ый', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ую', 'юю', 'ов', 'ев', 'а', 'я', 'о', 'е',
+    'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+# The search column, trigger and index (PostgreSQL) and the FTS5 table
+# (SQLite) are created by migration 0008. The FTS5 table is a standalone
+# one maintained on save: triggers would be lost whenever SQLite
+# migrations rebuild recipes_recipe.
+
+
+def index_recipe(recipe, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [recipe.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) VALUES (%s, %s, %s)',
+            [recipe.pk, recipe.name, recipe.text])
+
+
+def unindex_recipe(recipe, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [recipe.pk])
+
+
+def rebuild_index(using='default'):
+    # Bulk inserts bypass the save signals.
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                       f'SELECT id, name, text FROM recipes_recipe')
+
+
+def stem(word):
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def sqlite_match_query(query):
+    words = re.findall(r'\w+', query.casefold())
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def search(queryset, query):
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('russian', %s)"
+        queryset = queryset.annotate(
+            search_match=RawSQL(
+                f'recipes_recipe.search_vector @@ {tsquery}', [query],
+                output_field=BooleanField()),
+            search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {tsquery})', [query],
+                output_field=FloatField()),
+        ).filter(search_match=True)
+    elif vendor == 'sqlite':
+        match_query = sqlite_match_query(query)
+        if not match_query:
+            return queryset.none()
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match_query],
+        )).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'AND {FTS_TABLE}.rowid = recipes_recipe.id',
+                [match_query], output_field=FloatField()),
+        )
+    else:
+        return queryset.filter(Q(name__icontains=query)
+                               | Q(text__icontains=query))
+
+    return queryset.order_by('-search_rank', '-created_at', '-id')
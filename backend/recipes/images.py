@@ -0,0 +1,108 @@
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from foodgram.cache import bump_version
+from recipes.models import Recipe
+from recipes.versions import RECIPES_VERSION, recipe_version
+
+RENDITIONS_DIR = 'recipes/images/renditions'
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+EXTENSIONS = {
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+
+
+def needs_processing(recipe):
+    return bool(recipe.image) and (
+        recipe.image_renditions.get('source') != recipe.image.name)
+
+
+def too_large(size):
+    width, height = size
+    return width * height > settings.RECIPE_IMAGE_MAX_PIXELS
+
+
+def flatten(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, image_format):
+    pil_format, options = FORMATS[image_format]
+    if pil_format == 'JPEG':
+        image = flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    # Nothing from the upload (EXIF, ICC, comments) is passed on.
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_renditions(recipe_id, source, storage):
+    stem = posixpath.splitext(posixpath.basename(source))[0]
+    with storage.open(source) as file, Image.open(file) as original:
+        # Uploads through the API are checked by RecipeImageField already.
+        if too_large(original.size):
+            width, height = original.size
+            raise ValueError(f'Image {source} is {width}x{height} pixels')
+        original = ImageOps.exif_transpose(original)
+
+        renditions = {'source': source}
+        for size_name, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+            image = original.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            rendition = {'width': image.width, 'height': image.height}
+            for image_format in FORMATS:
+                name = posixpath.join(
+                    RENDITIONS_DIR, str(recipe_id),
+                    f'{stem}-{size_name}.{EXTENSIONS[image_format]}')
+                if storage.exists(name):
+                    storage.delete(name)
+                rendition[image_format] = storage.save(
+                    name, ContentFile(encode(image, image_format)))
+            renditions[size_name] = rendition
+    return renditions
+
+
+def delete_renditions(renditions, storage):
+    for size_name in settings.RECIPE_IMAGE_RENDITIONS:
+        for image_format in FORMATS:
+            name = renditions.get(size_name, {}).get(image_format)
+            if name:
+                storage.delete(name)
+
+
+def process_recipe_image(recipe_id, source):
+    storage = Recipe._meta.get_field('image').storage
+    recipe = Recipe.objects.filter(pk=recipe_id, image=source).only(
+        'image_renditions').first()
+    if recipe is None:
+        # The image was replaced or the recipe deleted in the meantime.
+        return
+
+    renditions = build_renditions(recipe_id, source, storage)
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_renditions=renditions)
+    if not updated:
+        delete_renditions(renditions, storage)
+        return
+
+    if recipe.image_renditions.get('source') != source:
+        delete_renditions(recipe.image_renditions, storage)
+    bump_version(RECIPES_VERSION)
+    bump_version(recipe_version(recipe_id))
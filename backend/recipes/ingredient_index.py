@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.cache import get_version
+from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION
+
+
+def fold(value):
+    return value.casefold().replace('ё', 'е')
+
+
+def trigrams(value):
+    padded = f'  {value}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(left, right):
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, 1):
+        current = [i]
+        for j, right_char in enumerate(right, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (left_char != right_char)))
+        previous = current
+    return previous[-1]
+
+
+class IngredientIndex:
+    def __init__(self, rows):
+        self.rows = sorted(
+            ({'id': pk, 'name': name, 'measurement_unit': unit}
+             for pk, name, unit in rows),
+            key=lambda row: row['name']
+        )
+        folded = sorted((fold(row['name']), position)
+                        for position, row in enumerate(self.rows))
+        self.keys = [key for key, _ in folded]
+        self.positions = [position for _, position in folded]
+
+        self.words = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        for position, row in enumerate(self.rows):
+            for word in fold(row['name']).split():
+                self.words[position].add(word)
+                for trigram in trigrams(word):
+                    self.trigrams[trigram].add(position)
+
+    def all(self):
+        return self.rows
+
+    def search(self, query, fuzzy_limit=10):
+        query = fold(query.strip())
+        if not query:
+            return self.rows
+        return self.prefix(query) or self.fuzzy(query, fuzzy_limit)
+
+    def prefix(self, query):
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\U0010ffff', lo=start)
+        return [self.rows[position]
+                for position in sorted(self.positions[start:end])]
+
+    def fuzzy(self, query, limit):
+        # Typo tolerant prefix match: compare the query with the beginning
+        # of every word that shares a trigram with it.
+        allowed = max(1, len(query) // 4)
+        candidates = set()
+        for trigram in trigrams(query):
+            candidates |= self.trigrams.get(trigram, set())
+
+        scored = []
+        for position in candidates:
+            distance = min(edit_distance(query, word[:len(query)])
+                           for word in self.words[position])
+            if distance <= allowed:
+                scored.append((distance, position))
+        return [self.rows[position] for _, position in sorted(scored)[:limit]]
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_ingredient_index():
+    global _index, _index_version
+
+    version = get_version(INGREDIENTS_VERSION)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            # With a shared cache backend (see CACHES in settings) only the
+            # first worker to see a new version reads the table, the
+            # others build their index from its row snapshot.
+            rows_key = f'ingredient-index-rows:{version}'
+            rows = cache.get(rows_key)
+            if rows is None:
+                rows = list(Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'))
+                cache.set(rows_key, rows, settings.INGREDIENT_INDEX_TIMEOUT)
+            _index, _index_version = IngredientIndex(rows), version
+    return _index
@@ -0,0 +1,183 @@
+import json
+import random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from recipes import feed, fulltext
+from recipes.benchmarks import SCENARIOS
+from recipes.management.commands.import_ingredients import read_csv
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Выпечка', '#F9A62B', 'bakery'),
+    ('Суп', '#2D9CDB', 'soup'),
+)
+
+WORDS = ('борщ', 'суп', 'пирог', 'салат', 'каша', 'омлет', 'рагу', 'плов',
+         'котлеты', 'блины', 'запеканка', 'соус', 'паста', 'щи')
+
+
+class Command(BaseCommand):
+    help = ''' Seed a synthetic dataset into a test database and run the
+    benchmark scenarios on it: API endpoints, recipe querysets, recipe
+    serializers, ingredient search and JSON backends. '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                            default=['endpoints'])
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Authors followed by every user')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Favorites and cart items of every user')
+        parser.add_argument('--csv-file', type=str,
+                            default=settings.BASE_DIR.parent / 'data'
+                            / 'ingredients.csv')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--page-sizes', type=int, nargs='+',
+                            default=[10, 50],
+                            help='Pages rendered by the serializers and '
+                                 'json scenarios')
+        parser.add_argument('--fans', type=int, nargs='+',
+                            default=[0, 100, 1000],
+                            help='Fans of the first page of recipes in the '
+                                 'recipe_queryset scenario')
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Prefixes looked up by ingredient_search')
+        parser.add_argument('--upload-kib', type=int, default=2048,
+                            help='Image size of the upload parsed by json')
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', type=str,
+                            help='Write the report to a file')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('At least 2 users and 1 recipe are required')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False,
+                                     keepdb=options['keepdb'],
+                                     aliases={'default'})
+        try:
+            with override_settings(CACHES=BENCH_CACHES):
+                report = {'dataset': self.seed(options)}
+                for name in options['scenarios']:
+                    report[name] = self.run(name, options)
+        finally:
+            teardown_databases(old_config, verbosity=0,
+                               keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        with open(options['csv_file'], 'r', encoding='utf-8-sig') as file:
+            rows = dict.fromkeys(read_csv(file))
+        ingredient_ids = [ingredient.id for ingredient in
+                          Ingredient.objects.bulk_create(
+                              Ingredient(name=name, measurement_unit=unit)
+                              for name, unit in rows)]
+        tag_ids = [tag.id for tag in Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in TAGS)]
+
+        password = make_password('bench')
+        users = User.objects.bulk_create(
+            User(username=f'bench{i}', email=f'bench{i}@bench.local',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for i in range(options['users'])
+        )
+        user_ids = [user.id for user in users]
+
+        recipes = Recipe.objects.bulk_create(
+            (Recipe(author_id=rng.choice(user_ids),
+                    name=' '.join(rng.sample(WORDS, 2)).capitalize(),
+                    text=' '.join(rng.choices(WORDS, k=40)),
+                    image=f'recipes/images/bench{i % 50}.png',
+                    cooking_time=rng.randint(5, 180))
+             for i in range(options['recipes'])),
+            batch_size=1000,
+        )
+        recipe_ids = [recipe.id for recipe in recipes]
+
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+             for recipe_id in recipe_ids
+             for tag_id in rng.sample(tag_ids, rng.randint(1, 3))),
+            batch_size=1000,
+        )
+        RecipeIngredient.objects.bulk_create(
+            (RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                              amount=rng.randint(1, 500))
+             for recipe_id in recipe_ids
+             for ingredient_id in rng.sample(ingredient_ids,
+                                             rng.randint(3, 10))),
+            batch_size=1000,
+        )
+
+        follows = min(options['follows'], len(user_ids) - 1)
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id in user_ids
+             for author_id in rng.sample(
+                 [pk for pk in user_ids if pk != user_id], follows)),
+            batch_size=1000,
+        )
+        favorites = min(options['favorites'], len(recipe_ids))
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (model(user_id=user_id, recipe_id=recipe_id)
+                 for user_id in user_ids
+                 for recipe_id in rng.sample(recipe_ids, favorites)),
+                batch_size=1000,
+            )
+        Recipe.objects.rebuild_counters()
+        fulltext.rebuild_index()
+        for user_id in user_ids:
+            feed.rebuild_feed(user_id)
+
+        return {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'ingredients': len(ingredient_ids),
+            'tags': len(tag_ids),
+            'follows': Follow.objects.count(),
+            'favorites': Favorite.objects.count(),
+            'shopping_cart': ShoppingCart.objects.count(),
+        }
+
+    def run(self, name, options):
+        # Data added by a scenario is rolled back and the cache emptied,
+        # so every scenario starts from the seeded dataset.
+        with transaction.atomic():
+            result = SCENARIOS[name](options)
+            transaction.set_rollback(True)
+        cache.clear()
+        return result
@@ -1,35 +1,156 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 from tqdm import tqdm
 
+from foodgram.cache import bump_version, is_process_local
 from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION, RECIPE_INGREDIENTS_VERSION
+
+
+def read_csv(file):
+    for line_number, row in enumerate(csv.reader(file), 1):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise CommandError(
+                f'Line {line_number}: expected name and measurement unit, '
+                f'got {row!r}')
+        yield row[0].strip(), row[1].strip()
+
+
+def read_json(file, chunk_size=64 * 1024):
+    # Decodes the top level array item by item instead of loading the
+    # whole document.
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Expected a JSON array of ingredients')
+    buffer = buffer[1:]
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().removeprefix(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise CommandError(f'Malformed JSON: {error}')
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        try:
+            yield item['name'].strip(), item['measurement_unit'].strip()
+        except (KeyError, TypeError, AttributeError):
+            raise CommandError(f'Malformed ingredient: {item!r}')
+        buffer = buffer[end:]
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 class Command(BaseCommand):
-    help = ''' Import ingredients from CSV '''
+    help = ''' Import ingredients from CSV or JSON '''
 
     def add_arguments(self, parser):
-        parser.add_argument("csv_file", type=str)
+        parser.add_argument('file', type=str)
+        parser.add_argument('--format', choices=READERS,
+                            help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--update', action='store_true',
+                            help='Update the measurement unit of existing '
+                                 'ingredients with the same name')
 
     def handle(self, *args, **options):
-        file_path = options.get('csv_file')
+        file_path = Path(options['file'])
+        file_format = options['format'] or file_path.suffix.lstrip('.')
+        if file_format not in READERS:
+            raise CommandError(f'Unsupported file format: {file_format!r}')
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive')
 
+        started = time.perf_counter()
         try:
-            with open(file_path, 'r', encoding='utf-8-sig') as csv_file:
-                reader = csv.reader(csv_file, delimiter=',')
-
-                created_count = 0
-                for ingredient, unit in tqdm(reader,
-                                             desc='Importing ingredients'):
-                    obj, created = Ingredient.objects.get_or_create(
-                        name=ingredient,
-                        measurement_unit=unit
-                    )
-                    if created:
-                        created_count += 1
-
-                print(f'Imported {created_count} ingredients')
-
-        except Exception as e:
-            print('Failed to open file. Error: ' + str(e))
+            with open(file_path, 'r', encoding='utf-8-sig') as file:
+                stats = self.import_rows(READERS[file_format](file),
+                                         options['batch_size'],
+                                         options['update'])
+        except OSError as error:
+            raise CommandError(f'Failed to open file. Error: {error}')
+
+        bump_version(INGREDIENTS_VERSION)
+        if stats['updated']:
+            bump_version(RECIPE_INGREDIENTS_VERSION)
+        if is_process_local():
+            self.stderr.write(
+                'The cache is per-process: running servers keep their '
+                'ingredient index and cached lists until they restart. '
+                'Configure a shared CACHE_BACKEND.')
+
+        elapsed = time.perf_counter() - started
+        print(f"Imported {stats['inserted']} ingredients, "
+              f"updated {stats['updated']}, skipped {stats['skipped']} "
+              f"in {elapsed:.2f}s")
+
+    def import_rows(self, rows, batch_size, update):
+        stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        with tqdm(desc='Importing ingredients', unit=' rows') as progress:
+            for batch in batched(rows, batch_size):
+                with transaction.atomic():
+                    updated = self.update_units(batch) if update else set()
+                    # One lookup through the unique (name, unit) index;
+                    # ignore_conflicts only covers concurrent imports.
+                    existing = set(Ingredient.objects.filter(
+                        name__in={name for name, _ in batch},
+                    ).values_list('name', 'measurement_unit'))
+                    new = [
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in dict.fromkeys(batch)
+                        if name not in updated and (name, unit) not in existing
+                    ]
+                    Ingredient.objects.bulk_create(
+                        new, batch_size=batch_size, ignore_conflicts=True)
+                    inserted = len(new)
+
+                stats['inserted'] += inserted
+                stats['updated'] += len(updated)
+                stats['skipped'] += len(batch) - inserted - len(updated)
+                progress.update(len(batch))
+        return stats
+
+    def update_units(self, batch):
+        units = dict(batch)
+        existing = {}
+        for ingredient in Ingredient.objects.filter(name__in=units):
+            existing.setdefault(ingredient.name, []).append(ingredient)
+
+        changed = []
+        for name, ingredients in existing.items():
+            # Names with several units are ambiguous and left untouched.
+            if len(ingredients) != 1:
+                continue
+            ingredient = ingredients[0]
+            if ingredient.measurement_unit != units[name]:
+                ingredient.measurement_unit = units[name]
+                changed.append(ingredient)
+
+        Ingredient.objects.bulk_update(changed, ['measurement_unit'])
+        return {ingredient.name for ingredient in changed}
@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand, CommandError
+from tqdm import tqdm
+
+from foodgram.cache import is_process_local
+from recipes.images import needs_processing, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ''' Generate missing renditions of recipe images '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate existing renditions too')
+
+    def handle(self, *args, **options):
+        if is_process_local():
+            # The running server would keep the original image URLs.
+            raise CommandError(
+                'The cache is per-process, the server would not see the new '
+                'renditions. Configure a shared CACHE_BACKEND.')
+        recipes = Recipe.objects.only('image', 'image_renditions').iterator()
+        processed = failed = 0
+        for recipe in tqdm(recipes, desc='Processing images', unit=' recipes'):
+            if not recipe.image:
+                continue
+            if not (options['force'] or needs_processing(recipe)):
+                continue
+            try:
+                process_recipe_image(recipe.pk, recipe.image.name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe.pk}: {error}')
+            else:
+                processed += 1
+        print(f'Processed {processed} images, failed {failed}')
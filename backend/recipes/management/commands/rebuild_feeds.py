@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+from tqdm import tqdm
+
+from recipes.feed import rebuild_feed
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ''' Rebuild the feed timelines of all users from their follows '''
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(Follow.objects.values_list('user_id', flat=True))
+            | set(FeedEntry.objects.values_list('user_id', flat=True)))
+        for user_id in tqdm(user_ids, desc='Rebuilding feeds',
+                            unit=' users'):
+            rebuild_feed(user_id)
@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ''' Recalculate favorite and shopping cart counters of recipes '''
+
+    def handle(self, *args, **options):
+        updated = Recipe.objects.rebuild_counters()
+        print(f'Rebuilt counters of {updated} recipes')
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+
+    def count_by_recipe(model_name):
+        model = apps.get_model('recipes', model_name)
+        counts = (
+            model.objects.filter(recipe=OuterRef('pk'))
+            .order_by().values('recipe')
+            .annotate(count=Count('pk')).values('count')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    Recipe.objects.update(
+        favorites_count=count_by_recipe('Favorite'),
+        in_carts_count=count_by_recipe('ShoppingCart'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipeingredient_unique_recipe_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во добавлений в списки покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-created_at'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
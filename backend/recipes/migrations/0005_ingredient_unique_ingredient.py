@@ -0,0 +1,50 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    # The admin allowed adding the same ingredient twice, keep the oldest
+    # row and move the recipes of the others over to it.
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(keep_id=Min('id'), rows=Count('id')).filter(rows__gt=1)
+    )
+    for group in duplicates:
+        keep_id = group['keep_id']
+        other_ids = list(
+            Ingredient.objects.filter(name=group['name'],
+                                      measurement_unit=group['measurement_unit'])
+            .exclude(id=keep_id).values_list('id', flat=True)
+        )
+        for row in RecipeIngredient.objects.filter(
+                ingredient_id__in=other_ids).order_by('id'):
+            # unique_recipe_ingredient still covers the amount here, rows
+            # that differ only in the amount are merged by 0006.
+            if RecipeIngredient.objects.filter(
+                    recipe_id=row.recipe_id, ingredient_id=keep_id,
+                    amount=row.amount).exists():
+                row.delete()
+            else:
+                row.ingredient_id = keep_id
+                row.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:50
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_stale_amounts(apps, schema_editor):
+    # Editing an amount used to add a second row for the same ingredient,
+    # keep only the newest one.
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    latest = (
+        RecipeIngredient.objects.values('recipe', 'ingredient')
+        .annotate(latest_id=Max('id')).values_list('latest_id', flat=True)
+    )
+    RecipeIngredient.objects.exclude(id__in=list(latest)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='recipeingredient',
+            name='unique_recipe_ingredient',
+        ),
+        migrations.RunPython(remove_stale_amounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
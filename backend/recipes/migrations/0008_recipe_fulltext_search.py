@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# Literal statements, so later changes to recipes.fulltext can't change
+# what this migration does.
+PG_SETUP = [
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    '''
+    CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector_update()
+    ''',
+    'UPDATE recipes_recipe SET name = name',
+    'CREATE INDEX recipes_recipe_search_idx ON recipes_recipe '
+    'USING GIN (search_vector)',
+]
+
+PG_TEARDOWN = [
+    'DROP INDEX IF EXISTS recipes_recipe_search_idx',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+    'ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_SETUP = [
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+    'name, text, tokenize="unicode61 remove_diacritics 2")',
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    'SELECT id, name, text FROM recipes_recipe',
+]
+
+SQLITE_TEARDOWN = [
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': PG_SETUP, 'sqlite': SQLITE_SETUP}),
+            run({'postgresql': PG_TEARDOWN, 'sqlite': SQLITE_TEARDOWN}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Уменьшенные копии картинки'),
+        ),
+    ]
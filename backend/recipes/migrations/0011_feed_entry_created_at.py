@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:33
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_created_at(apps, schema_editor):
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry.objects.update(created_at=Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe_id')).values('created_at')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации рецепта'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-created_at', '-recipe'], name='feed_entry_timeline_idx'),
+        ),
+    ]
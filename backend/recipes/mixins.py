@@ -0,0 +1,36 @@
+from urllib.parse import urlencode
+
+from foodgram.cache import cached_json_response, get_versions
+
+
+def list_cache_key(basename, request, names, versions):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return ':'.join(
+        # Cached bodies hold absolute URLs.
+        [basename, 'list', request.scheme, request.get_host()]
+        + [str(versions[name]) for name in names]
+        + [query]
+    )
+
+
+class VersionedListCacheMixin:
+    # Names of the versions bumped by model signals whenever the listed
+    # data changes, see recipes.signals.
+    cache_versions = ()
+    cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_list_cache(request):
+            return super().list(request, *args, **kwargs)
+
+        versions = get_versions(*self.cache_versions)
+        key = list_cache_key(self.basename, request, self.cache_versions,
+                             versions)
+        return cached_json_response(request, key, self.get_list_data,
+                                    self.cache_timeout)
+
+    def use_list_cache(self, request):
+        return request.accepted_renderer.format == 'json'
+
+    def get_list_data(self):
+        return super().list(self.request, *self.args, **self.kwargs).data
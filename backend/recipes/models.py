@@ -1,8 +1,10 @@
-from django.contrib.admin import display
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Exists, OuterRef, Prefetch, Sum
+from django.db import connections, models, router
+from django.db.models import (BooleanField, Count, ExpressionWrapper, F,
+                              OuterRef, Prefetch, Q, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Greatest
 
+from recipes.relations import FAVORITES, SHOPPING_CART
 from recipes.validators import hex_color_regex
 
 
@@ -14,6 +16,12 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'Ингредиент: {self.name}, {self.measurement_unit}'
@@ -38,7 +46,7 @@ class RecipeIngredient(models.Model):
         verbose_name_plural = 'Ингредиенты рецептов'
         constraints = [
             models.UniqueConstraint(
-                fields=['recipe', 'ingredient', 'amount'],
+                fields=['recipe', 'ingredient'],
                 name='unique_recipe_ingredient'
             )
         ]
@@ -64,46 +72,62 @@ class Tag(models.Model):
         return f'Тег: {self.slug} ({self.name})'
 
 
+def count_by_recipe(model):
+    counts = (
+        model.objects.filter(recipe=OuterRef('pk'))
+        .order_by().values('recipe')
+        .annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def in_relation(ids):
+    # A literal id list from the relation cache instead of a correlated
+    # EXISTS per row. Sorted, so equal sets produce the same SQL.
+    if not ids:
+        return Value(False)
+    return ExpressionWrapper(Q(pk__in=sorted(ids)),
+                             output_field=BooleanField())
+
+
 class RecipeQuerySet(models.QuerySet):
-    def with_related(self):
-        fav_obj = Favorite.objects
-        sh_car_obj = ShoppingCart.objects
-        rec_ing_obj = RecipeIngredient.objects
-        favorites = Prefetch(
-            'favorites',
-            queryset=fav_obj.select_related('user', 'recipe')
-        )
-        shoping_cart = Prefetch(
-            'shopping_cart',
-            queryset=sh_car_obj.select_related('user', 'recipe')
-        )
+    def for_list(self):
+        return self.for_representation().with_content()
+
+    def for_representation(self):
+        # RecipeRepresentation fetches tags and ingredients itself, only
+        # for recipes missing in the fragment cache.
+        return self.select_related('author')
+
+    def with_content(self):
         recipe_ingredients = Prefetch(
             'recipe_ingredients',
-            queryset=rec_ing_obj.select_related('recipe', 'ingredient')
+            queryset=RecipeIngredient.objects.select_related('ingredient')
         )
-        return (
-            self.select_related('author')
-            .prefetch_related('tags', 'ingredients')
-            .prefetch_related(favorites)
-            .prefetch_related(shoping_cart)
-            .prefetch_related(recipe_ingredients)
+        return self.prefetch_related('tags', recipe_ingredients)
+
+    def for_admin(self):
+        return self.select_related('author')
+
+    def for_write(self):
+        return self.select_related('author')
+
+    def adjust_counter(self, field, delta):
+        return self.update(**{field: Greatest(F(field) + delta, 0)})
+
+    def rebuild_counters(self):
+        return self.update(
+            favorites_count=count_by_recipe(Favorite),
+            in_carts_count=count_by_recipe(ShoppingCart),
         )
 
     def annotate_is_favorited(self, user):
         return self.annotate(
-            is_favorited=Exists(
-                Favorite.objects.filter(recipe=OuterRef('pk'), user=user.pk),
-            ))
+            is_favorited=in_relation(FAVORITES.ids(user.pk)))
 
     def annotate_is_in_shopping_cart(self, user):
         return self.annotate(
-            is_in_shopping_cart=Exists(
-                ShoppingCart.objects.filter(
-                    recipe=OuterRef('pk'),
-                    user=user.pk,
-                ),
-            ),
-        )
+            is_in_shopping_cart=in_relation(SHOPPING_CART.ids(user.pk)))
 
 
 class Recipe(models.Model):
@@ -112,6 +136,8 @@ class Recipe(models.Model):
                                related_name='recipes')
     name = models.CharField('Название', max_length=200)
     image = models.ImageField('Картинка', upload_to='recipes/images/')
+    image_renditions = models.JSONField('Уменьшенные копии картинки',
+                                        default=dict, editable=False)
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField('Ingredient',
                                          through='RecipeIngredient')
@@ -121,21 +147,27 @@ class Recipe(models.Model):
         validators=[MinValueValidator(1)]
     )
     created_at = models.DateTimeField('Дата публикации', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'Кол-во добавлений в избранное', default=0, editable=False)
+    in_carts_count = models.PositiveIntegerField(
+        'Кол-во добавлений в списки покупок', default=0, editable=False)
 
     objects = RecipeQuerySet().as_manager()
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='recipe_created_idx'),
+            models.Index(fields=['-favorites_count', '-created_at'],
+                         name='recipe_popular_idx'),
+        ]
 
     def __str__(self):
         return f'Рецепт: {self.name} от {self.author.username}'
 
-    @display(description="Кол-во добавлений в избранное")
-    def favorite_count(self):
-        return Favorite.objects.filter(recipe_id=self.id).count()
-
 
 class Favorite(models.Model):
     user = models.ForeignKey('users.User', verbose_name='Пользователь',
@@ -177,21 +209,64 @@ class ShoppingCart(models.Model):
         return f'Корзина {self.user.username}: {self.recipe.name}'
 
     @classmethod
-    def export(cls, user):
-        lines = ["Список покупок:\n"]
-
-        recipe_ids = user.shopping_cart.values_list('recipe__id', flat=True)
-        ing_obj = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
-        ingredients = (
-            ing_obj.select_related('ingredient')
+    def ingredients(cls, user):
+        return (
+            RecipeIngredient.objects
+            .filter(recipe__shopping_cart__user=user)
             .values('ingredient__name', 'ingredient__measurement_unit')
             .annotate(total_amount=Sum('amount'))
             .order_by('ingredient__name')
         )
 
-        for obj in ingredients:
-            lines.append(
-                f"- {obj['ingredient__name']} — {obj['total_amount']} "
-                f"{obj['ingredient__measurement_unit']}")
 
-        return '\n'.join(lines)
+# Recipe counters of the models users add recipes to.
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def delete_user_recipes(model, user_id, recipe_ids):
+    # One DELETE for Favorite or ShoppingCart rows. QuerySet.delete() would
+    # collect the rows and send post_delete for each of them.
+    using = router.db_for_write(model)
+    quote = connections[using].ops.quote_name
+    meta = model._meta
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.get_field("user").column)} = %s '
+            f'AND {quote(meta.get_field("recipe").column)} '
+            f'IN ({placeholders})',
+            [user_id, *recipe_ids])
+        return cursor.rowcount
+
+
+class FeedEntry(models.Model):
+    # Recipes of followed authors fanned out to every follower, see
+    # recipes.feed.
+    user = models.ForeignKey('users.User', verbose_name='Пользователь',
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               on_delete=models.CASCADE,
+                               related_name='feed_entries')
+    # Copy of Recipe.created_at, timelines are paginated by this table
+    # alone.
+    created_at = models.DateTimeField('Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe'],
+                         name='feed_entry_timeline_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Лента {self.user.username}: {self.recipe.name}'
@@ -0,0 +1,64 @@
+from array import array
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.cache import get_version
+from recipes.versions import (favorites_version, follows_version,
+                              shopping_cart_version)
+
+
+class RelationSet:
+    # Ids of the objects a user is related to, cached as a packed array
+    # under the per-user version that model signals bump on every change.
+    # Actions that change a relation write the new set through right away,
+    # so the next request of that user is served from the cache.
+    def __init__(self, name, model, target_field, version):
+        self.name = name
+        self.model_label = model
+        self.target_field = target_field
+        self.version = version
+
+    def key(self, user_id):
+        version = get_version(self.version(user_id))
+        return f'relations:{self.name}:{user_id}:{version}'
+
+    def load(self, user_id):
+        model = apps.get_model(self.model_label)
+        return frozenset(model.objects.filter(user_id=user_id)
+                         .values_list(self.target_field, flat=True))
+
+    def store(self, key, ids):
+        cache.set(key, array('q', sorted(ids)),
+                  settings.RELATIONS_CACHE_TIMEOUT)
+
+    def ids(self, user_id):
+        if user_id is None:
+            return frozenset()
+        # The key is read before the rows, a change committed in between
+        # bumps the version and the stale set is never read back.
+        key = self.key(user_id)
+        packed = cache.get(key)
+        if packed is not None:
+            return frozenset(packed)
+        ids = self.load(user_id)
+        self.store(key, ids)
+        return ids
+
+    def refresh(self, user_id):
+        key = self.key(user_id)
+        self.store(key, self.load(user_id))
+
+    def refresh_on_commit(self, user_id):
+        # Runs after the version bump queued by the signal handlers.
+        transaction.on_commit(lambda: self.refresh(user_id))
+
+
+FAVORITES = RelationSet('favorites', 'recipes.Favorite', 'recipe_id',
+                        favorites_version)
+SHOPPING_CART = RelationSet('shopping-cart', 'recipes.ShoppingCart',
+                            'recipe_id', shopping_cart_version)
+FOLLOWS = RelationSet('follows', 'users.Follow', 'author_id',
+                      follows_version)
@@ -0,0 +1,33 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from recipes.exports import canvas
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Exports are streamed by the view; only error payloads get here.
+        return JSONRenderer().render(data, accepted_media_type,
+                                     renderer_context)
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+SHOPPING_LIST_RENDERERS = [PlainTextRenderer, CSVRenderer, JSONRenderer]
+if canvas is not None:
+    SHOPPING_LIST_RENDERERS.append(PDFRenderer)
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from foodgram.cache import get_versions
+from recipes.models import Recipe
+from recipes.serializers_common import absolute_url, recipe_images
+from recipes.versions import INGREDIENTS_VERSION, TAGS_VERSION, recipe_version
+from users.serializers import is_subscribed
+
+
+def represent_author(author, context):
+    return {
+        'id': author.id,
+        'email': author.email,
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'is_subscribed': is_subscribed(context, author.id),
+    }
+
+
+def represent_tag(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color,
+        'slug': tag.slug,
+    }
+
+
+def represent_ingredient(row):
+    ingredient = row.ingredient
+    return {
+        'id': row.ingredient_id,
+        'name': ingredient.name,
+        'amount': row.amount,
+        'measurement_unit': ingredient.measurement_unit,
+    }
+
+
+def represent_content(recipe, request):
+    # The part of a recipe that is the same for every viewer.
+    return {
+        'id': recipe.id,
+        'tags': [represent_tag(tag) for tag in recipe.tags.all()],
+        'ingredients': [represent_ingredient(row)
+                        for row in recipe.recipe_ingredients.all()],
+        'name': recipe.name,
+        'image': (absolute_url(recipe.image.url, request)
+                  if recipe.image else None),
+        'images': recipe_images(recipe, request),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def get_contents(recipes, request):
+    # Contents are cached per recipe under its own version and the global
+    # tags and ingredients versions, see recipes.signals. URLs in them are
+    # absolute, so the base URL is a part of the key too.
+    names = [recipe_version(recipe.id) for recipe in recipes]
+    versions = get_versions(TAGS_VERSION, INGREDIENTS_VERSION, *names)
+    base_url = absolute_url('/', request)
+    keys = {
+        recipe.id: (f'recipe-content:{recipe.id}:{versions[name]}:'
+                    f'{versions[TAGS_VERSION]}:'
+                    f'{versions[INGREDIENTS_VERSION]}:{base_url}')
+        for recipe, name in zip(recipes, names)
+    }
+    found = cache.get_many(keys.values())
+
+    missing = [pk for pk, key in keys.items() if key not in found]
+    if missing:
+        # Fetched after the versions were read, so rows changed since the
+        # page was loaded are never cached under the new version.
+        built = {
+            keys[recipe.id]: represent_content(recipe, request)
+            for recipe in Recipe.objects.filter(pk__in=missing)
+            .with_content().order_by()
+        }
+        cache.set_many(built, settings.RECIPE_CONTENT_CACHE_TIMEOUT)
+        found.update(built)
+    return {pk: found.get(key) for pk, key in keys.items()}
+
+
+class RecipeListRepresentation(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data)
+        contents = get_contents(recipes, self.context.get('request'))
+        return [self.child.represent(recipe, contents[recipe.id])
+                for recipe in recipes]
+
+
+class RecipeRepresentation(serializers.BaseSerializer):
+    # Read only counterpart of RecipeListRetrieveSerializer that renders
+    # the same output from Recipe.objects.for_representation(). Contents of
+    # recipes come from the cache, only the author and the flags of the
+    # viewer are rendered for every request.
+    class Meta:
+        list_serializer_class = RecipeListRepresentation
+
+    def to_representation(self, recipe):
+        contents = get_contents([recipe], self.context.get('request'))
+        return self.represent(recipe, contents[recipe.id])
+
+    def represent(self, recipe, content):
+        if content is None:
+            # Deleted after the page was fetched.
+            content = represent_content(recipe, self.context.get('request'))
+        return {
+            'id': recipe.id,
+            'author': represent_author(recipe.author, self.context),
+            'tags': content['tags'],
+            'ingredients': content['ingredients'],
+            'is_favorited': bool(recipe.is_favorited),
+            'is_in_shopping_cart': bool(recipe.is_in_shopping_cart),
+            'name': content['name'],
+            'image': content['image'],
+            'images': content['images'],
+            'text': content['text'],
+            'cooking_time': content['cooking_time'],
+        }
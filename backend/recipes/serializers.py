@@ -1,12 +1,19 @@
 from collections import defaultdict
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from foodgram.cache import bump_version_on_commit
+from recipes.images import too_large
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
-from recipes.serializers_common import RecipeShortSerializer
+from recipes.serializers_common import RecipeImagesField, RecipeShortSerializer
+from recipes.versions import RECIPE_INGREDIENTS_VERSION
 from users.serializers import UserSerializer
 
 
@@ -23,10 +30,9 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    # Existence of ingredients is checked for the whole recipe at once in
+    # RecipeCreateUpdateSerializer.validate.
+    id = serializers.IntegerField(source='ingredient_id')
     measurement_unit = serializers.SlugRelatedField(
         source='ingredient',
         slug_field='measurement_unit',
@@ -43,6 +49,21 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'amount', 'measurement_unit')
 
 
+class RecipeImageField(Base64ImageField):
+    def to_internal_value(self, data):
+        image = super().to_internal_value(data)
+        # Pillow reads the size from the header, pixels are decoded only
+        # by the background task building renditions.
+        with Image.open(image) as header:
+            size = header.size
+        image.seek(0)
+        if too_large(size):
+            raise serializers.ValidationError(
+                f'Image is too large: {size[0]}x{size[1]} pixels, at most '
+                f'{settings.RECIPE_IMAGE_MAX_PIXELS} pixels are allowed.')
+        return image
+
+
 class RecipeListRetrieveSerializer(serializers.ModelSerializer):
     is_favorited = serializers.BooleanField(read_only=True)
     is_in_shopping_cart = serializers.BooleanField(read_only=True)
@@ -50,6 +71,7 @@ class RecipeListRetrieveSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientsSerializer(many=True,
                                               source='recipe_ingredients')
     author = UserSerializer()
+    images = RecipeImagesField()
 
     class Meta:
         model = Recipe
@@ -57,13 +79,14 @@ class RecipeListRetrieveSerializer(serializers.ModelSerializer):
             'id', 'author',
             'tags', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time')
+            'name', 'image', 'images', 'text', 'cooking_time')
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     is_favorited = serializers.BooleanField(read_only=True)
     is_in_shopping_cart = serializers.BooleanField(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
+    images = RecipeImagesField()
     author = UserSerializer(read_only=True)
     tags = serializers.PrimaryKeyRelatedField(many=True,
                                               queryset=Tag.objects.all())
@@ -76,44 +99,103 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             'id', 'cooking_time', 'author',
             'name', 'text', 'is_favorited',
             'is_in_shopping_cart',
-            'ingredients', 'tags', 'image',
+            'ingredients', 'tags', 'image', 'images',
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('recipe_ingredients', [])
+        ingredients = validated_data.pop('recipe_ingredients', {})
 
         request = self.context["request"]
         recipe_obj = Recipe.objects.create(author_id=request.user.id,
                                            **validated_data)
 
-        self._attach_ingredients(recipe_obj, ingredients)
-        recipe_obj.tags.add(*tags)
+        self._sync_ingredients(recipe_obj, ingredients, existing=())
+        self._sync_tags(recipe_obj, tags, existing=())
         return recipe_obj
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('recipe_ingredients', [])
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('recipe_ingredients', None)
         instance = super().update(instance, validated_data)
-        self._attach_ingredients(instance, ingredients)
+
+        if ingredients is not None:
+            self._sync_ingredients(
+                instance, ingredients,
+                existing=RecipeIngredient.objects.filter(recipe=instance))
+        if tags is not None:
+            self._sync_tags(
+                instance, tags,
+                existing=instance.tags.through.objects
+                .filter(recipe=instance).values_list('tag_id', flat=True))
         return instance
 
     def validate(self, attrs):
-        ingredients = attrs.pop('recipe_ingredients', [])
+        if 'recipe_ingredients' not in attrs:
+            return attrs
+
         unique_ingredients = defaultdict(int)
-        for ing in ingredients:
-            unique_ingredients[ing['ingredient']] += ing['amount']
+        for ing in attrs.pop('recipe_ingredients'):
+            unique_ingredients[ing['ingredient_id']] += ing['amount']
+
+        found = set(Ingredient.objects.filter(id__in=unique_ingredients)
+                    .values_list('id', flat=True))
+        missing = [pk for pk in unique_ingredients if pk not in found]
+        if missing:
+            raise serializers.ValidationError({'ingredients': [
+                f'Invalid pk "{pk}" - object does not exist.'
+                for pk in missing
+            ]})
+
         attrs['recipe_ingredients'] = unique_ingredients
         return attrs
 
-    def _attach_ingredients(self, recipe_obj, ingredients):
-        ingredients_to_append = []
-        for ingredient, amount in ingredients.items():
-            RecipeIngredient.objects.get_or_create(recipe=recipe_obj,
-                                                   ingredient=ingredient,
-                                                   amount=amount)
-            ingredients_to_append.append(ingredient)
-
-        recipe_obj.ingredients.set(ingredients_to_append)
+    def to_representation(self, instance):
+        prefetch_related_objects([instance], 'tags', Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
+        return super().to_representation(instance)
+
+    def _sync_ingredients(self, recipe_obj, amounts, existing):
+        existing = {row.ingredient_id: row for row in existing}
+        to_create, to_update = [], []
+        for ingredient_id, amount in amounts.items():
+            row = existing.pop(ingredient_id, None)
+            if row is None:
+                to_create.append(RecipeIngredient(recipe=recipe_obj,
+                                                  ingredient_id=ingredient_id,
+                                                  amount=amount))
+            elif row.amount != amount:
+                row.amount = amount
+                to_update.append(row)
+
+        if existing:
+            RecipeIngredient.objects.filter(
+                id__in=[row.id for row in existing.values()]).delete()
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create or to_update:
+            # Bulk writes bypass the model signals.
+            bump_version_on_commit(RECIPE_INGREDIENTS_VERSION)
+
+    def _sync_tags(self, recipe_obj, tags, existing):
+        through = Recipe.tags.through
+        existing = set(existing)
+        wanted = {tag.id for tag in tags}
+
+        if existing - wanted:
+            through.objects.filter(recipe=recipe_obj,
+                                   tag_id__in=existing - wanted).delete()
+        if wanted - existing:
+            through.objects.bulk_create(
+                through(recipe=recipe_obj, tag_id=tag_id)
+                for tag_id in wanted - existing
+            )
 
 
 class RecipeActionSerializer(serializers.ModelSerializer):
@@ -147,3 +229,23 @@ class ShoppingCartSerializer(RecipeActionSerializer):
                 message="Recipe is already in shopping cart"
             )
         ]
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1),
+                                max_length=settings.RECIPE_BATCH_MAX_SIZE,
+                                default=list)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=settings.RECIPE_BATCH_MAX_SIZE, default=list)
+
+    def validate(self, attrs):
+        add = list(dict.fromkeys(attrs['add']))
+        remove = list(dict.fromkeys(attrs['remove']))
+        if not add and not remove:
+            raise serializers.ValidationError(
+                'Pass recipe ids to add or remove.')
+        if set(add) & set(remove):
+            raise serializers.ValidationError(
+                'A recipe can not be added and removed at once.')
+        return {'add': add, 'remove': remove}
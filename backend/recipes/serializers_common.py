@@ -1,9 +1,51 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from recipes.images import FORMATS
 from recipes.models import Recipe
 
 
+def recipe_images(recipe, request=None):
+    # Renditions are generated in the background, until then every size
+    # points to the original upload.
+    if not recipe.image:
+        return None
+    storage = recipe.image.storage
+    renditions = recipe.image_renditions
+    if renditions.get('source') != recipe.image.name:
+        renditions = {}
+
+    images = {}
+    for size_name in settings.RECIPE_IMAGE_RENDITIONS:
+        rendition = renditions.get(size_name)
+        images[size_name] = {
+            image_format: absolute_url(
+                storage.url(rendition[image_format]) if rendition
+                else recipe.image.url, request)
+            for image_format in FORMATS
+        }
+    return images
+
+
+def absolute_url(url, request=None):
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class RecipeImagesField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return recipe_images(recipe, self.context.get('request'))
+
+
 class RecipeShortSerializer(serializers.ModelSerializer):
+    images = RecipeImagesField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
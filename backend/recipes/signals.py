@@ -0,0 +1,127 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram.cache import bump_version_on_commit
+from foodgram.tasks import run_in_background
+from recipes import feed, fulltext, images
+from recipes.models import (RECIPE_COUNTERS, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.versions import (INGREDIENTS_VERSION, RECIPE_INGREDIENTS_VERSION,
+                              RECIPES_VERSION, TAGS_VERSION, USERS_VERSION,
+                              favorites_version, follows_version,
+                              recipe_version, shopping_cart_version)
+from users.models import Follow, User
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    bump_version_on_commit(shopping_cart_version(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorites_changed(sender, instance, **kwargs):
+    bump_version_on_commit(favorites_version(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follows_changed(sender, instance, **kwargs):
+    bump_version_on_commit(follows_version(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        run_in_background(feed.add_author, instance.user_id,
+                          instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    # Right away, the feed is read from the timeline table only.
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, instance, **kwargs):
+    bump_version_on_commit(TAGS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, instance, **kwargs):
+    bump_version_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=Ingredient)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    bump_version_on_commit(RECIPE_INGREDIENTS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipes_changed(sender, **kwargs):
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    bump_version_on_commit(recipe_version(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    bump_version_on_commit(recipe_version(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_version_on_commit(recipe_version(instance.pk))
+    elif pk_set:
+        for recipe_id in pk_set:
+            bump_version_on_commit(recipe_version(recipe_id))
+    else:
+        # tag.recipe_set.clear() does not tell which recipes lost the tag.
+        bump_version_on_commit(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, using, **kwargs):
+    fulltext.index_recipe(instance, using)
+    if created:
+        run_in_background(feed.fan_out_recipe, instance.pk)
+    if images.needs_processing(instance):
+        run_in_background(images.process_recipe_image,
+                          instance.pk, instance.image.name)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, using, **kwargs):
+    fulltext.unindex_recipe(instance, using)
+
+
+@receiver((post_save, post_delete), sender=User)
+def users_changed(sender, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which is never rendered.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit(USERS_VERSION)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_counter_increment(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).adjust_counter(
+            RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_counter_decrement(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).adjust_counter(
+        RECIPE_COUNTERS[sender], -1)
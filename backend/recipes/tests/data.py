@@ -0,0 +1,66 @@
+import base64
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+# A 1x1 PNG.
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0ecC'
+    'AAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJg'
+    'gg=='
+)
+
+
+class MediaRootMixin:
+    # Uploaded images go to a temporary MEDIA_ROOT removed after the class.
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='foodgram-test-media-')
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+def create_dataset(users=4, recipes=12, ingredients=8):
+    # Every user follows the others and keeps a few recipes in favorites
+    # and in the shopping cart.
+    users = [User.objects.create_user(
+        username=f'user{i}', email=f'user{i}@example.com', password='secret',
+        first_name='Анна', last_name='Иванова') for i in range(users)]
+    tags = [Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}') for i in range(3)]
+    ingredients = [Ingredient.objects.create(name=f'ингредиент {i}',
+                                             measurement_unit='г')
+                   for i in range(ingredients)]
+    for i in range(recipes):
+        recipe = Recipe(author=users[i % len(users)], name=f'Рецепт {i}',
+                        text='Нарезать, смешать и запечь. ' * 3,
+                        cooking_time=10 + i)
+        recipe.image.save(f'recipe{i}.png', ContentFile(PNG), save=False)
+        recipe.save()
+        recipe.tags.set(tags[:i % len(tags) + 1])
+        for j in range(3):
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredient=ingredients[(i + j) % len(ingredients)],
+                amount=j + 1)
+    for user in users:
+        for author in users:
+            if author != user:
+                Follow.objects.create(user=user, author=author)
+        for recipe in Recipe.objects.exclude(author=user)[:3]:
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+    return users, tags, ingredients
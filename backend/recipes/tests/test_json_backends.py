@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from foodgram.parsers import ORJSONParser
+from foodgram.renderers import ORJSONRenderer
+from recipes.tests.data import MediaRootMixin, create_dataset
+
+BACKENDS = {
+    'json': ('rest_framework.renderers.JSONRenderer',
+             'rest_framework.parsers.JSONParser',
+             JSONRenderer, JSONParser),
+    'orjson': ('foodgram.renderers.ORJSONRenderer',
+               'foodgram.parsers.ORJSONParser',
+               ORJSONRenderer, ORJSONParser),
+}
+
+
+class JSONBackendsTest(MediaRootMixin, TestCase):
+    # JSON_BACKEND=orjson must not change a single byte of the API.
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.tags, cls.ingredients = create_dataset()
+        cls.token = Token.objects.create(user=cls.users[0])
+        cls.recipe = cls.users[1].recipes.order_by('id').first()
+        # JSONRenderer escapes the JavaScript line terminators.
+        cls.recipe.text = 'Шаг 1.\u2028Шаг 2.\u2029 «Готово» 😋'
+        cls.recipe.save()
+
+    def fetch(self, backend, method, url, data=None, authenticated=True):
+        renderer, parser, renderer_class, parser_class = BACKENDS[backend]
+        rest_framework = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_RENDERER_CLASSES': [
+                renderer, 'rest_framework.renderers.BrowsableAPIRenderer'],
+            'DEFAULT_PARSER_CLASSES': [
+                parser, 'rest_framework.parsers.FormParser',
+                'rest_framework.parsers.MultiPartParser'],
+        }
+        # View classes copy the defaults when they are defined, the
+        # settings override covers the cached responses.
+        cache.clear()
+        client = APIClient()
+        if authenticated:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with override_settings(REST_FRAMEWORK=rest_framework), \
+                mock.patch.object(APIView, 'renderer_classes',
+                                  [renderer_class, BrowsableAPIRenderer]), \
+                mock.patch.object(APIView, 'parser_classes',
+                                  [parser_class, FormParser,
+                                   MultiPartParser]):
+            response = getattr(client, method)(url, data, format='json')
+        return response.status_code, response.content
+
+    def assertSameBody(self, method, url, data=None, authenticated=True):
+        expected = self.fetch('json', method, url, data, authenticated)
+        self.assertEqual(self.fetch('orjson', method, url, data,
+                                    authenticated), expected)
+        return expected
+
+    def test_recipes(self):
+        detail = f'/recipes/{self.recipe.id}/'
+        for url in ('/recipes/', '/recipes/?limit=5&page=2',
+                    '/recipes/?is_favorited=1', f'/recipes/?tags={self.tags[0].slug}',
+                    detail):
+            with self.subTest(url=url):
+                self.assertEqual(self.assertSameBody('get', url)[0], 200)
+        with self.subTest(url=detail, authenticated=False):
+            self.assertSameBody('get', detail, authenticated=False)
+        with self.subTest(url='/recipes/', authenticated=False):
+            self.assertSameBody('get', '/recipes/', authenticated=False)
+
+    def test_users(self):
+        for url in ('/users/', f'/users/{self.users[1].id}/', '/users/me/',
+                    '/users/subscriptions/?recipes_limit=2'):
+            with self.subTest(url=url):
+                self.assertEqual(self.assertSameBody('get', url)[0], 200)
+
+    def test_tags_and_ingredients(self):
+        for url in ('/tags/', f'/tags/{self.tags[0].id}/', '/ingredients/',
+                    '/ingredients/?name=ингр',
+                    f'/ingredients/{self.ingredients[0].id}/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.assertSameBody('get', url)[0], 200)
+
+    def test_errors(self):
+        cases = [
+            ('get', '/recipes/0/', None, True, 404),
+            ('get', '/users/me/', None, False, 401),
+            ('post', '/recipes/', {'name': '', 'cooking_time': 0,
+                                   'tags': [0], 'ingredients': []},
+             True, 400),
+            ('post', f'/users/{self.users[0].id}/subscribe/', None, True,
+             400),
+            ('post', f'/recipes/{self.recipe.id}/favorite/', None, False,
+             401),
+        ]
+        for method, url, data, authenticated, status in cases:
+            with self.subTest(method=method, url=url):
+                self.assertEqual(self.assertSameBody(
+                    method, url, data, authenticated)[0], status)
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.tests.data import MediaRootMixin, create_dataset
+
+
+class ListCacheTest(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(users=2, recipes=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_scheme_is_part_of_the_key(self):
+        client = APIClient()
+        for secure, scheme in ((False, 'http://'), (True, 'https://')):
+            with self.subTest(scheme=scheme):
+                response = client.get('/recipes/', secure=secure)
+                image = response.json()['results'][0]['image']
+                self.assertTrue(image.startswith(scheme), image)
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.instrumentation import query_budget
+from recipes.tests.data import MediaRootMixin, create_dataset
+
+
+class QueryBudgetTest(MediaRootMixin, TestCase):
+    # Budgets of the hot endpoints with a cold cache and with a warm one.
+    # They must not depend on the size of a page.
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, _, _ = create_dataset(users=5, recipes=30)
+        cls.token = Token.objects.create(user=cls.users[0])
+        cls.recipe = cls.users[1].recipes.order_by('id').first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, url, budget):
+        with query_budget(budget):
+            response = self.client.get(url)
+            # Streamed files query while the body is read.
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertBudgets(self, urls, cold, warm):
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.get(url, cold)
+                self.get(url, warm)
+
+    def test_recipe_list(self):
+        # Token, favorites, cart, count, page, recipe contents with tags
+        # and ingredients, follows; only the page once they are cached.
+        self.assertBudgets(
+            ['/recipes/?limit=5', '/recipes/?limit=25',
+             '/recipes/?limit=25&page=2'], cold=9, warm=1)
+
+    def test_anonymous_recipe_list(self):
+        self.client.credentials()
+        self.assertBudgets(['/recipes/?limit=5', '/recipes/?limit=25'],
+                           cold=5, warm=0)
+
+    def test_recipe_detail(self):
+        self.assertBudgets([f'/recipes/{self.recipe.id}/'], cold=8, warm=1)
+
+    def test_subscriptions(self):
+        # Token, count, authors, their recipes in one windowed query.
+        # The token and the count come from the cache the second time.
+        self.assertBudgets(
+            ['/users/subscriptions/?recipes_limit=1',
+             '/users/subscriptions/?recipes_limit=10',
+             '/users/subscriptions/?limit=2&recipes_limit=3'],
+            cold=4, warm=2)
+
+    def test_download_shopping_cart(self):
+        self.assertBudgets(['/recipes/download_shopping_cart/'],
+                           cold=2, warm=0)
@@ -0,0 +1,53 @@
+import base64
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.data import MediaRootMixin
+from users.models import User
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+@override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+class RecipeImageTest(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='secret', first_name='Анна', last_name='Иванова')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(name='Обед', color='#49B64E',
+                                     slug='lunch')
+        cls.ingredient = Ingredient.objects.create(name='соль',
+                                                   measurement_unit='г')
+
+    def create(self, image):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client.post('/recipes/', {
+            'name': 'Суп', 'text': 'Сварить.', 'cooking_time': 10,
+            'tags': [self.tag.id], 'image': image,
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+        }, format='json')
+
+    def test_too_many_pixels(self):
+        response = self.create(png(20, 6))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_pixel_limit(self):
+        response = self.create(png(10, 10))
+        self.assertEqual(response.status_code, 201)
+        with Image.open(Recipe.objects.get().image) as image:
+            self.assertEqual(image.size, (10, 10))
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from foodgram.cache import bump_version
+from recipes.models import Favorite
+from recipes.relations import FAVORITES
+from recipes.tests.data import MediaRootMixin, create_dataset
+
+
+class RelationSetTest(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_dataset(users=2, recipes=4)[0][0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_change_during_load_is_not_cached(self):
+        load = FAVORITES.load
+        stale = load(self.user.id)
+
+        def load_then_change(user_id):
+            ids = load(user_id)
+            # A favorite removed and its version bumped right after the
+            # rows were read.
+            Favorite.objects.filter(user=self.user).delete()
+            bump_version(FAVORITES.version(user_id))
+            return ids
+
+        with mock.patch.object(FAVORITES, 'load', load_then_change):
+            self.assertEqual(FAVORITES.ids(self.user.id), stale)
+        self.assertEqual(FAVORITES.ids(self.user.id), frozenset())
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
@@ -11,3 +12,18 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from recipes import async_views
+
+    views = {pattern.name: pattern.callback for pattern in router.urls}
+    urlpatterns = [
+        path('recipes/', async_views.read_view(
+            async_views.recipe_list, views['recipes-list'])),
+        path('recipes/<int:pk>/', async_views.read_view(
+            async_views.recipe_detail, views['recipes-detail'])),
+        path('tags/', async_views.read_view(
+            async_views.tag_list, views['tags-list'])),
+        path('ingredients/', async_views.read_view(
+            async_views.ingredient_list, views['ingredients-list'])),
+    ] + urlpatterns
@@ -0,0 +1,21 @@
+INGREDIENTS_VERSION = 'ingredients'
+RECIPE_INGREDIENTS_VERSION = 'recipe-ingredients'
+RECIPES_VERSION = 'recipes'
+TAGS_VERSION = 'tags'
+USERS_VERSION = 'users'
+
+
+def recipe_version(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def shopping_cart_version(user_id):
+    return f'shopping-cart:{user_id}'
+
+
+def favorites_version(user_id):
+    return f'favorites:{user_id}'
+
+
+def follows_version(user_id):
+    return f'follows:{user_id}'
@@ -1,91 +1,231 @@
 from typing import Type, Union
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from foodgram.cache import bump_version_on_commit
+from foodgram.pagination import RecipeCursorPagination, RecipePagination
+from recipes.exports import ShoppingListExport
+from recipes.feed import decode_cursor, encode_cursor, read_feed
 from recipes.filters import IngredientSearchFilter, RecipeFilter
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.ingredient_index import get_ingredient_index
+from recipes.mixins import VersionedListCacheMixin
+from recipes.models import (RECIPE_COUNTERS, Favorite, Ingredient, Recipe,
+                            ShoppingCart, Tag, delete_user_recipes)
+from recipes.relations import FAVORITES, SHOPPING_CART, RelationSet
+from recipes.renderers import SHOPPING_LIST_RENDERERS
+from recipes.representations import RecipeRepresentation
 from recipes.serializers import (FavoritesSerializer, IngredientSerializer,
+                                 RecipeBatchSerializer,
                                  RecipeCreateUpdateSerializer,
                                  RecipeListRetrieveSerializer,
                                  ShoppingCartSerializer, TagSerializer)
+from recipes.versions import (INGREDIENTS_VERSION, RECIPES_VERSION,
+                              TAGS_VERSION, USERS_VERSION)
+from users.models import User
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all().with_related()
+class RecipeViewSet(VersionedListCacheMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+    pagination_count_strategy = 'estimated'
+    cache_versions = (RECIPES_VERSION, TAGS_VERSION, USERS_VERSION)
+    cache_timeout = settings.ANONYMOUS_RECIPES_CACHE_TIMEOUT
 
     def get_serializer_class(self):
-        if self.action in ('retrieve', 'list'):
+        if self.action in ('retrieve', 'list', 'feed'):
+            # The browsable API asks for forms with a cloned PUT request.
+            if self.request.method in ('GET', 'HEAD'):
+                return RecipeRepresentation
             return RecipeListRetrieveSerializer
         return RecipeCreateUpdateSerializer
 
     def get_queryset(self):
         user = self.request.user
-        var = self.queryset.annotate_is_favorited(user)
-        return var.annotate_is_in_shopping_cart(user)
+        if self.get_serializer_class() is RecipeRepresentation:
+            queryset = self.queryset.for_representation()
+        elif self.action in ('retrieve', 'list', 'feed'):
+            queryset = self.queryset.for_list()
+        else:
+            queryset = self.queryset.for_write()
+        queryset = queryset.annotate_is_favorited(user)
+        return queryset.annotate_is_in_shopping_cart(user)
+
+    def use_list_cache(self, request):
+        # Per-user flags are constant for anonymous visitors only.
+        return (not request.user.is_authenticated
+                and super().use_list_cache(request))
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        # Recipes of the authors the user follows, newest first. Pages
+        # come from the timeline table, recipes are loaded for one page.
+        paginator = RecipeCursorPagination()
+        cursor = request.query_params.get(paginator.cursor_query_param)
+        position = decode_cursor(cursor) if cursor else None
+        rows, next_position = read_feed(
+            request.user, position, paginator.get_page_size(request))
+        ids = [recipe_id for _, recipe_id in rows]
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True)
+        next_link = None
+        if next_position is not None:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), paginator.cursor_query_param,
+                encode_cursor(next_position))
+        # Same shape as RecipeCursorPagination, the feed only goes forward.
+        return Response({'next': next_link, 'previous': None,
+                         'results': serializer.data})
 
     @action(detail=True, methods=['POST'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk: int):
-        return self._add(FavoritesSerializer)
+        return self._add(FavoritesSerializer, FAVORITES)
 
     @favorite.mapping.delete
     def unfavorite(self, request, pk: int):
-        return self._cancel(Favorite)
+        return self._cancel(Favorite, FAVORITES)
 
     @action(detail=True, methods=['POST'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk: int):
-        return self._add(ShoppingCartSerializer)
+        return self._add(ShoppingCartSerializer, SHOPPING_CART)
 
     @shopping_cart.mapping.delete
     def remove_from_shopping_cart(self, request, pk: int):
-        return self._cancel(ShoppingCart)
+        return self._cancel(ShoppingCart, SHOPPING_CART)
+
+    @action(detail=False, methods=['POST'], url_path='favorite/batch',
+            permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self._batch(Favorite, FAVORITES)
+
+    @action(detail=False, methods=['POST'], url_path='shopping_cart/batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return self._batch(ShoppingCart, SHOPPING_CART)
+
+    def _lock_user(self):
+        # Serializes the favorite and cart writes of one user, so rows read
+        # in the transaction can not change before they are written.
+        User.objects.select_for_update().get(pk=self.request.user.pk)
 
     def _add(self, serializer_class: Union[Type[FavoritesSerializer],
-                                           Type[ShoppingCartSerializer]]):
+                                           Type[ShoppingCartSerializer]],
+             relation: RelationSet):
         recipe = self.get_object()
 
-        serializer = serializer_class(data={
-            'user': self.request.user.id,
-            'recipe': recipe.id
-        })
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            self._lock_user()
+            serializer = serializer_class(data={
+                'user': self.request.user.id,
+                'recipe': recipe.id
+            })
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        relation.refresh_on_commit(self.request.user.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def _cancel(self, model: Union[Type[Favorite], Type[ShoppingCart]]):
+    def _cancel(self, model: Union[Type[Favorite], Type[ShoppingCart]],
+                relation: RelationSet):
         recipe = self.get_object()
-        obj = get_object_or_404(model, user=self.request.user, recipe=recipe)
-        obj.delete()
+        with transaction.atomic():
+            self._lock_user()
+            obj = get_object_or_404(model, user=self.request.user,
+                                    recipe=recipe)
+            obj.delete()
+        relation.refresh_on_commit(self.request.user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    def _batch(self, model: Union[Type[Favorite], Type[ShoppingCart]],
+               relation: RelationSet):
+        # {"add": [1, 2], "remove": [3]} in one transaction. Bulk writes
+        # skip the model signals, so counters and caches are updated here.
+        serializer = RecipeBatchSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        add = serializer.validated_data['add']
+        remove = serializer.validated_data['remove']
+        user = self.request.user
+        counter = RECIPE_COUNTERS[model]
+
+        with transaction.atomic():
+            self._lock_user()
+            found = set(Recipe.objects.filter(pk__in=add + remove)
+                        .values_list('id', flat=True))
+            existing = set(model.objects.filter(user=user,
+                                                recipe_id__in=add + remove)
+                           .values_list('recipe_id', flat=True))
+            added = [pk for pk in add if pk in found and pk not in existing]
+            removed = [pk for pk in remove if pk in existing]
+
+            # The user lock keeps `existing` exact until commit, so every
+            # row in `added` is inserted and every one in `removed` deleted.
+            if added:
+                model.objects.bulk_create(
+                    [model(user=user, recipe_id=pk) for pk in added],
+                    ignore_conflicts=True)
+                Recipe.objects.filter(pk__in=added).adjust_counter(counter, 1)
+            if removed:
+                delete_user_recipes(model, user.id, removed)
+                Recipe.objects.filter(pk__in=removed).adjust_counter(counter,
+                                                                     -1)
+            if added or removed:
+                bump_version_on_commit(relation.version(user.id))
+                relation.refresh_on_commit(user.id)
+
+        def status_of(pk, done, done_status, skipped_status):
+            if pk not in found:
+                return 'not_found'
+            return done_status if pk in done else skipped_status
+
+        added, removed = set(added), set(removed)
+        return Response({
+            'add': [{'id': pk,
+                     'status': status_of(pk, added, 'added', 'exists')}
+                    for pk in add],
+            'remove': [{'id': pk,
+                        'status': status_of(pk, removed, 'removed', 'missing')}
+                       for pk in remove],
+        })
+
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        shopping_list_str = ShoppingCart.export(request.user)
-        response = HttpResponse(shopping_list_str, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="list.txt"'
-        return response
+        export = ShoppingListExport(request.user,
+                                    request.accepted_renderer.format)
+        return export.response(request)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(VersionedListCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    cache_versions = (TAGS_VERSION,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(VersionedListCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
+    cache_versions = (INGREDIENTS_VERSION,)
+
+    def get_list_data(self):
+        index = get_ingredient_index()
+        query = self.request.query_params.get(
+            IngredientSearchFilter.search_param)
+        return index.search(query) if query else index.all()
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.cache import (aget_versions, bump_version,
+                            bump_version_on_commit, get_version)
+
+
+def token_version(key):
+    # Raw keys are credentials and must not show up in cache key listings.
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def token_cache_key(key, version):
+    return f'{token_version(key)}:{version}'
+
+
+def get_token(key):
+    # The token with its user, or None. Cached for a short time under a
+    # per-token version that signal handlers bump when the token or its
+    # user changes. The version is read before the row, so a row read
+    # just before a logout commits is cached under a dead version.
+    cache_key = token_cache_key(key, get_version(token_version(key)))
+    token = cache.get(cache_key)
+    if token is None:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is not None:
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+    return token
+
+
+async def aget_token(key):
+    name = token_version(key)
+    versions = await aget_versions(name)
+    cache_key = token_cache_key(key, versions[name])
+    token = await cache.aget(cache_key)
+    if token is None:
+        token = await Token.objects.select_related('user').filter(
+            key=key).afirst()
+        if token is not None:
+            await cache.aset(cache_key, token,
+                             settings.AUTH_TOKEN_CACHE_TIMEOUT)
+    return token
+
+
+def forget_tokens_on_commit(*keys):
+    # Also bumped right away, the commit hook covers readers that cached
+    # the old row under the current version while the transaction was in
+    # progress.
+    for key in keys:
+        bump_version(token_version(key))
+        bump_version_on_commit(token_version(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return token.user, token
@@ -11,13 +11,6 @@ class User(AbstractUser):
     first_name = models.CharField(_("first name"), max_length=150)
     last_name = models.CharField(_("last name"), max_length=150)
 
-    def is_subscribed(self, to_user: 'User'):
-        if to_user is None:
-            return False
-
-        return Follow.objects.filter(user_id=self.id,
-                                     author_id=to_user.id).exists()
-
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -3,10 +3,41 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueTogetherValidator
 
+from recipes.relations import FOLLOWS
 from recipes.serializers_common import RecipeShortSerializer
 from users.models import Follow, User
 
 
+def get_recipes_limit(request):
+    recipes_limit = getattr(request, 'query_params', {}).get('recipes_limit')
+    if recipes_limit is None:
+        return None
+
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        raise ValidationError({'recipes_limit': 'A valid integer is required.'})
+    if recipes_limit < 0:
+        raise ValidationError({'recipes_limit': 'Must not be negative.'})
+    return recipes_limit
+
+
+def is_subscribed(context, author_id):
+    request = context.get('request')
+    current_user: User = getattr(request, 'user', None)
+    if current_user is None or not current_user.is_authenticated:
+        return False
+
+    subscribed_ids = context.get('subscribed_ids')
+    if subscribed_ids is None:
+        # Resolved once and shared by every nested serializer of the
+        # response, so a page of users costs a single cache lookup.
+        subscribed_ids = FOLLOWS.ids(current_user.id)
+        context['subscribed_ids'] = subscribed_ids
+
+    return author_id in subscribed_ids
+
+
 class UserSerializer(_UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -22,12 +53,7 @@ class UserSerializer(_UserSerializer):
         )
 
     def get_is_subscribed(self, obj: User):
-        request = self.context.get('request')
-        current_user: User = getattr(request, 'user', None)
-        if current_user is None or not current_user.is_authenticated:
-            return False
-
-        return current_user.is_subscribed(obj)
+        return is_subscribed(self.context, obj.id)
 
 
 class UserSubscriptionSerializer(UserSerializer):
@@ -40,16 +66,20 @@ class UserSubscriptionSerializer(UserSerializer):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit is not None:
-            recipes = recipes[:int(recipes_limit)]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
 
         return RecipeShortSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is None:
+            return obj.recipes.count()
+        return recipes_count
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -74,6 +104,6 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         request = self.context.get('request')
-        context = {'request': request}
+        context = {'request': request, 'subscribed_ids': {instance.author_id}}
         return UserSubscriptionSerializer(instance.author,
                                           context=context).data
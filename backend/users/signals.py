@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import forget_tokens_on_commit
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Token)
+def token_changed(sender, instance, **kwargs):
+    # Logout deletes the token, rotation replaces it with a new key.
+    forget_tokens_on_commit(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Cached tokens carry the user, so password changes, deactivation and
+    # profile edits must not be served from the cache.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    forget_tokens_on_commit(*Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True))
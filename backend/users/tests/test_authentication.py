@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from users.authentication import get_token
+from users.models import User
+
+
+class TokenCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='secret',
+            first_name='Анна', last_name='Иванова')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_logout_during_read_is_not_cached(self):
+        first = QuerySet.first
+
+        def first_then_logout(queryset):
+            # The row is read, then a logout deletes the token before the
+            # reader stores the row.
+            token = first(queryset)
+            Token.objects.filter(key=self.token.key).delete()
+            return token
+
+        with mock.patch.object(QuerySet, 'first', first_then_logout):
+            self.assertIsNotNone(get_token(self.token.key))
+        self.assertIsNone(get_token(self.token.key))
+
+    def test_cached(self):
+        get_token(self.token.key)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_token(self.token.key), self.token)
@@ -1,23 +1,46 @@
+from django.db.models import Count, Prefetch
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from recipes.models import Recipe
+from recipes.relations import FOLLOWS
 from users.models import Follow, User
-from users.serializers import FollowSerializer, UserSubscriptionSerializer
+from users.serializers import (FollowSerializer, UserSubscriptionSerializer,
+                               get_recipes_limit)
 
 
 class UserSubscriptionsViewSet(viewsets.GenericViewSet):
     queryset = User.objects.all().prefetch_related('follower')
     permission_classes = (AllowAny,)
+    pagination_count_strategy = 'cached'
 
     @action(detail=False)
     def subscriptions(self, request):
-        qs = User.objects.filter(following__user_id=request.user.id)
+        latest_recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            # Sliced prefetch is resolved with a window function, so only
+            # the newest recipes of every author on the page are fetched.
+            latest_recipes = latest_recipes[:recipes_limit]
+
+        qs = (
+            User.objects.filter(following__user_id=request.user.id)
+            .annotate(recipes_count=Count('recipes', distinct=True))
+            .prefetch_related(Prefetch('recipes',
+                                       queryset=latest_recipes,
+                                       to_attr='latest_recipes'))
+            .order_by('id')
+        )
         qs = self.paginate_queryset(qs)
+        context = {
+            'request': request,
+            'subscribed_ids': {author.id for author in qs},
+        }
         serializer = UserSubscriptionSerializer(qs, many=True,
-                                                context={'request': request})
+                                                context=context)
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['POST'])
@@ -31,6 +54,7 @@ class UserSubscriptionsViewSet(viewsets.GenericViewSet):
             })
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        FOLLOWS.refresh_on_commit(self.request.user.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
@@ -40,4 +64,5 @@ class UserSubscriptionsViewSet(viewsets.GenericViewSet):
                                          author_id=author.id,
                                          user_id=self.request.user.id)
         subscription.delete()
+        FOLLOWS.refresh_on_commit(self.request.user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)